@@ -0,0 +1,254 @@
+'''
+Binary "all matches" baselines of the position matrix.
+
+All values of a season live in one file (baselines.bin): a small json index of offsets per baseline, position
+group and axis, followed by the float32 values, one contiguous run per index entry. The file is
+memory-mapped, so every worker process shares the same pages and a baseline is a NumPy view rather than
+a list of floats. Index and data are in one file so a rebuild replaces both atomically.
+
+Next to the raw values the file holds what the position matrix actually draws: histogram counts on a
+fixed bin grid per baseline and axis, and the box plot summary (quartiles and fences), so figures carry
+a few dozen bars and five numbers instead of every point of the tournament.
+'''
+import hashlib
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+from eventcache import write_atomic
+
+# Shipped next to this module, one {competition_id}/{season_id} subdirectory per season;
+# STATSBOMB_BASELINE_DIR points the app at another root.
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# Axes stored for each baseline, in the order the plotting functions index them
+AXES = {'receipt': ('x', 'y'),
+        'defence': ('x', 'y'),
+        'pass': ('length', 'angle'),
+        'shot': ('x', 'y'),
+        'carry': ('duration',)}
+
+# Histogram bin size per baseline and axis, the xbins sizes the position matrix has always used
+BIN_SIZES = {'receipt': {'x': 1, 'y': 1},
+             'defence': {'x': 1, 'y': 1},
+             'pass': {'length': 1, 'angle': 0.1},
+             'shot': {'x': 1, 'y': 1},
+             'carry': {'duration': 0.1}}
+
+BASELINE_FILE = 'baselines.bin'
+
+# File layout: MAGIC, little-endian uint32 header length, json header padded to ALIGN bytes, values
+MAGIC = b'SBBL'
+ALIGN = 16
+
+
+def _axis_values(name, values, axis):
+    '''
+    :param values: values of one baseline and position group as built by build_baselines
+    :return: list of floats along one axis
+    '''
+    if name == 'pass':
+        return [v[axis] for v in values]
+    if name == 'carry':
+        return values
+    return [v[AXES[name].index(axis)] for v in values]
+
+
+def compact(values):
+    '''
+    float32 values turn into float64 with spurious digits (39.7 -> 39.70000076293945), which bloat
+    figure json; round them to the 7 significant digits float32 holds.
+    :return: float64 array
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** (6 - np.floor(np.log10(np.abs(np.where(values == 0, 1, values)))))
+    return np.round(values * scale) / scale
+
+
+def bin_grid(values, size):
+    '''
+    :param values: array of values
+    :param size: bin width
+    :return: dict with start (a multiple of size) and count of the bins covering values
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return {'start': 0.0, 'size': size, 'count': 0}
+    start = float(np.floor(np.min(values) / size) * size)
+    count = int(np.floor((np.max(values) - start) / size + 1e-9)) + 1
+    return {'start': round(start, 10), 'size': size, 'count': count}
+
+
+def histogram(values, start, size, count):
+    '''
+    Count values into bins [start + i*size, start + (i+1)*size), as plotly bins with xbins.
+    :return: int array of length count
+    '''
+    index = np.floor((np.asarray(values, dtype=np.float64) - start) / size + 1e-9).astype(np.int64)
+    index = index[(index >= 0) & (index < count)]
+    return np.bincount(index, minlength=count)
+
+
+def box_summary(values):
+    '''
+    :param values: array of values
+    :return: dict of q1, median, q3 and the 1.5 IQR fences as plotly computes them, None if empty
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    return {'q1': round(float(q1), 9), 'median': round(float(median), 9), 'q3': round(float(q3), 9),
+            'lowerfence': float(values[values >= q1 - 1.5 * iqr].min()),
+            'upperfence': float(values[values <= q3 + 1.5 * iqr].max())}
+
+
+def write_baselines(baselines, out_dir):
+    '''
+    :param baselines: dict of baseline name to position group to values, as in json/all_<name>.json
+    :param out_dir: directory receiving baselines.bin, e.g. season_dir(competition_id, season_id)
+    '''
+    entries, hist, bins, summary = {}, {}, {}, {}
+    arrays = []
+    offset = 0
+    for name, axes in AXES.items():
+        for position, values in baselines[name].items():
+            for axis in axes:
+                key = f'{name}/{position}/{axis}'
+                array = np.asarray(_axis_values(name, values, axis), dtype='<f4')
+                entries[key] = [offset, len(array)]
+                arrays.append(array)
+                offset += len(array)
+
+                exact = compact(array)
+                grid = bin_grid(exact, BIN_SIZES[name][axis])
+                counts = histogram(exact, grid['start'], grid['size'], grid['count']).astype('<f4')
+                hist[key] = [offset, len(counts)]
+                arrays.append(counts)
+                offset += len(counts)
+                bins[key] = {'start': grid['start'], 'size': grid['size']}
+                summary[key] = box_summary(exact)
+
+    header = json.dumps({'dtype': '<f4', 'entries': entries, 'hist': hist,
+                         'bins': bins, 'summary': summary}).encode()
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % ALIGN)
+    data = np.concatenate(arrays).tobytes() if arrays else b''
+
+    path = os.path.join(out_dir, BASELINE_FILE)
+    write_atomic(path, MAGIC + struct.pack('<I', len(header)) + header + data)
+    return path
+
+
+def read_header(path):
+    '''
+    :param path: path of a baselines.bin
+    :return: (header dict, byte offset of the values)
+    '''
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a baseline file')
+        header_len, = struct.unpack('<I', f.read(4))
+        return json.loads(f.read(header_len)), len(MAGIC) + 4 + header_len
+
+
+def baseline_dir():
+    '''
+    :return: directory baselines are read from, resolved independently of the working directory
+    '''
+    return os.path.abspath(os.environ.get('STATSBOMB_BASELINE_DIR', BASELINE_DIR))
+
+
+def season_dir(competition_id, season_id, directory=None):
+    '''
+    :param directory: root of the baselines, defaults to baseline_dir()
+    :return: directory holding the baselines.bin of one competition season
+    '''
+    return os.path.join(directory or baseline_dir(), str(competition_id), str(season_id))
+
+
+class BaselineRegistry:
+    '''
+    Baselines opened on first use. Nothing is read at construction; the file is mapped on the first
+    lookup and its pages are only read from disk once a dataset is actually plotted.
+    '''
+
+    def __init__(self, directory=None):
+        '''
+        :param directory: directory holding baselines.bin, defaults to baseline_dir() at first use
+        '''
+        self.directory = directory
+        self._header = None
+        self._data = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def path(self):
+        return os.path.join(self.directory or baseline_dir(), BASELINE_FILE)
+
+    def exists(self):
+        '''
+        :return: True if the baselines of this registry have been built
+        '''
+        return os.path.exists(self.path())
+
+    def _load(self):
+        with self._lock:
+            if self._data is None:
+                path = self.path()
+                header, offset = read_header(path)
+                self._data = np.memmap(path, dtype=header['dtype'], mode='r', offset=offset)
+                with open(path, 'rb') as f:
+                    self._version = hashlib.sha256(f.read(offset)).hexdigest()
+                self._header = header
+            return self._header, self._data
+
+    def version(self):
+        '''
+        :return: sha256 of the header of the mapped file. The header holds the box summaries of every
+                 dataset, so it changes whenever the baselines are rebuilt from other data
+        '''
+        self._load()
+        return self._version
+
+    def _key(self, name, position, axis):
+        if isinstance(axis, int):
+            axis = AXES[name][axis]
+        return f'{name}/{position}/{axis}'
+
+    def get(self, name, position, axis):
+        '''
+        :param name: baseline name, e.g. 'receipt'
+        :param position: position group
+        :param axis: axis name, or its index in AXES[name]
+        :return: float32 array view of the baseline values
+        '''
+        header, data = self._load()
+        start, count = header['entries'][self._key(name, position, axis)]
+        return data[start:start + count]
+
+    def histogram(self, name, position, axis):
+        '''
+        :return: (float32 view of the bin counts, dict with the start and size of the bins)
+        '''
+        header, data = self._load()
+        key = self._key(name, position, axis)
+        start, count = header['hist'][key]
+        return data[start:start + count], header['bins'][key]
+
+    def summary(self, name, position, axis):
+        '''
+        :return: dict of q1, median, q3, lowerfence and upperfence, None for an empty baseline
+        '''
+        header, _ = self._load()
+        return header['summary'][self._key(name, position, axis)]
+
+    def preload(self):
+        '''
+        Map the file and read every page now, e.g. in a pre-fork server master so workers inherit
+        a warm mapping instead of each faulting the pages in on their first request.
+        '''
+        self._load()[1].sum()
@@ -0,0 +1,132 @@
+'''
+Benchmark of tacticplot.get_events against its former implementation, which located every shot with
+events.index(e) and re-scanned the event list once per category.
+
+Event lists are synthetic, shaped like projected Statsbomb events, so the benchmark runs offline:
+
+    python benchmarks/get_events.py [--sizes 1000 2000 4000 8000 16000 32000]
+
+get_events classifies through an EventTable and returns event dicts built from its columns, so both
+implementations are checked to put the same events (by index) in every category at every size. The time
+per event of get_events should stay flat as the list grows; the former implementation grows with the
+shot count.
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tacticplot import get_events
+
+
+def reference_get_events(events):
+    '''
+    get_events as it was before the single-pass rewrite, kept verbatim for comparison.
+    '''
+    goal_events = [e for e in events if e['type']['id'] == 16 and
+            e['shot']['outcome']['name'] == 'Goal' and e['period'] != 5]
+    no_goal_events = [e for e in events if e['type']['id'] == 16 and
+            e['shot']['outcome']['name'] != 'Goal' and e['period'] != 5]
+
+    goal_seq = {}
+    for e in goal_events:
+        before_goal_events = events[events.index(e)-5 : events.index(e)+1]
+        before_goal_events = [e for e in before_goal_events if 'location' in e]
+        goal_seq[e['index']] = before_goal_events
+
+    no_goal_seq = {}
+    for e in no_goal_events:
+        before_no_goal_events = events[events.index(e)-4 : events.index(e)+1]
+        before_no_goal_events= [e for e in before_no_goal_events if 'location' in e]
+        no_goal_seq[e['index']] = before_no_goal_events
+
+    carry = [e for e in events if e['type']['id'] == 43 and e['duration'] > 3.5]
+
+    defense = [e for e in events if e['type']['id'] == 9 or
+                                    (e['type']['id'] == 4 and e['duel']['type']['id'] == 11 and e['duel']['outcome'] in [4, 15, 16, 17]) or
+                                    (e['type']['id'] == 10 and e['interception']['outcome']['id'] in [4, 15, 16, 17])]
+
+    defense_no = [e for e in events if (e['type']['id'] == 4 and e['duel']['type']['id'] == 11 and e['duel']['outcome'] not in [4, 15, 16, 17]) or
+                                       (e['type']['id'] == 4 and e['duel']['type']['id'] == 10) or
+                                       (e['type']['id'] == 10 and e['interception']['outcome']['id'] not in [4, 15, 16, 17])]
+
+    passes_l = [e for e in events if e['type']['id'] == 30 and e['pass']['length'] > 40 and 'outcome' not in e['pass']]
+
+    starting_XI = [e for e in events if e['type']['id'] == 35]
+    tactic_shift = [e for e in events if e['type']['id'] == 36]
+
+    return (goal_events, no_goal_events, goal_seq, no_goal_seq, carry, defense,
+            defense_no, passes_l, starting_XI, tactic_shift)
+
+
+# Event types and their share of a match: pass, ball receipt, carry, pressure, duel, clearance,
+# interception, shot, starting XI, tactical shift
+TYPES = [(30, 30), (42, 28), (43, 24), (17, 9), (4, 4), (9, 2), (10, 1), (16, 1), (35, 0.05), (36, 0.05)]
+
+
+def synthetic_events(n, seed=0):
+    '''
+    :param n: number of events
+    :return: list of event dicts with the fields get_events reads
+    '''
+    rng = random.Random(seed)
+    types, weights = zip(*TYPES)
+    events = []
+    for i in range(n):
+        type_id = rng.choices(types, weights)[0]
+        e = {'index': i + 1, 'period': rng.choice([1, 2, 3, 4, 5]), 'minute': i // 30, 'second': i % 60,
+             'type': {'id': type_id}, 'team': {'id': 1, 'name': 'Team'}, 'duration': rng.uniform(0, 6)}
+        if type_id not in (35, 36):
+            e['location'] = [rng.uniform(0, 120), rng.uniform(0, 80)]
+        if type_id == 16:
+            e['shot'] = {'outcome': {'id': 97, 'name': 'Goal'} if rng.random() < 0.1 else {'id': 100, 'name': 'Saved'}}
+        elif type_id == 4:
+            e['duel'] = {'type': {'id': rng.choice([10, 11])}, 'outcome': {'id': rng.choice([4, 13, 16])}}
+        elif type_id == 10:
+            e['interception'] = {'outcome': {'id': rng.choice([4, 13, 16])}}
+        elif type_id == 30:
+            e['pass'] = {'length': rng.uniform(0, 70)}
+            if rng.random() < 0.2:
+                e['pass']['outcome'] = {'id': 9}
+        events.append(e)
+    return events
+
+
+def indices(result):
+    '''
+    :return: get_events result with every event replaced by its index
+    '''
+    return [{i: [e['index'] for e in seq] for i, seq in part.items()} if isinstance(part, dict)
+            else [e['index'] for e in part] for part in result]
+
+
+def best_of(function, events, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(events)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark tacticplot.get_events.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000, 8000, 16000, 32000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f'{"events":>8} {"get_events":>12} {"per event":>11} {"former":>12} {"per event":>11}')
+    for n in args.sizes:
+        events = synthetic_events(n)
+        if indices(get_events(events)) != indices(reference_get_events(events)):
+            raise SystemExit(f'get_events differs from the former implementation at {n} events')
+        new = best_of(get_events, events, args.repeat)
+        old = best_of(reference_get_events, events, args.repeat)
+        print(f'{n:>8} {new * 1e3:>10.2f}ms {new / n * 1e6:>9.3f}us {old * 1e3:>10.2f}ms {old / n * 1e6:>9.3f}us')
+
+
+if __name__ == '__main__':
+    main()
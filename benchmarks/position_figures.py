@@ -0,0 +1,188 @@
+'''
+Equivalence check and benchmark of the position matrix figures, which positionplot builds as plain dicts,
+against the go.Figure implementation they replace.
+
+Runs on matches of the configured Statsbomb source (the disk cache is enough once filled), the first
+three matches of the default season unless match ids are given:
+
+    python benchmarks/position_figures.py [match_id ...] [--repeat 3]
+
+Every plot_* function is called for both teams, every position group and axis, and its JSON is compared
+with the former implementation's. The figures of both are then timed.
+'''
+import argparse
+import json
+import os
+import sys
+import time
+
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from plotly.utils import PlotlyJSONEncoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import positionplot
+import soccerfield3
+from bundle import get_match_bundle
+from competitions import registry
+from positionplot import color_dict, position_id_dict, selection
+
+
+def reference_bars(trace):
+    return go.Bar(**{name: value for name, value in trace.items() if name != 'type'})
+
+
+def reference_box(trace):
+    return go.Box(**{name: value for name, value in trace.items() if name != 'type'})
+
+
+def reference_distribution(title, values, name, position, axis, registry, max=None, size=None):
+    '''
+    The go.Figure construction the plot_* histogram functions used before, kept for comparison. Traces
+    come from the same server-side binning, so only the figure construction is compared.
+    '''
+    fig = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3])
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=45), height = 260,
+                      title = dict(text=f'<b>{title}<b>',
+                                 xanchor="center", x=0.5, y=0.05),
+                      legend=dict(orientation='h', x=0, y=1.15),
+                      )
+    fig.update_layout(dragmode=False)
+
+    fig.add_trace(reference_bars(positionplot.baseline_bars(name, position, axis, registry)), row=1, col=1)
+    fig.add_trace(reference_bars(positionplot.selected_bars(values, name, position, axis, registry,
+                                                            size=size)), row=1, col=1)
+
+    fig.add_trace(reference_box(positionplot.baseline_box(name, position, axis, registry)), row=2, col=1)
+    fig.add_trace(reference_box(positionplot.selected_box(values, position)), row=2, col=1)
+
+    if max is not None:
+        fig.update_xaxes(range=[0, max], row=1, col=1, tickvals=list(range(0, max+1, 40)))
+        fig.update_xaxes(range=[0, max], row=2, col=1, tickvals=list(range(0, max+1, 40)))
+    fig.update_yaxes(showticklabels=False, row=2, col=1)
+
+    fig.update_layout(barmode='overlay')
+    fig.update_traces(opacity=0.45)
+    return fig
+
+
+def reference_contour(events, position):
+    '''
+    The go.Figure construction of the action heatmap, from the same server-side density.
+    '''
+    selected = selection(events)
+    field_layout = soccerfield3.get_layout()
+    fig = go.Figure(layout=field_layout)
+    fig.update_layout(xaxis=dict(showgrid=False, zeroline=False), yaxis=dict(showgrid=False, zeroline=False),
+                      plot_bgcolor='rgba(0, 0, 0, 0)', paper_bgcolor='rgba(0, 0, 0, 0)',
+                      margin=dict(l=0, r=10, t=0, b=45), height = 260,
+                      title = dict(text=f'<b>{position} action heatmap<b>',
+                                 xanchor="center", x=0.5, y=0.05))
+    fig.update_layout(dragmode=False)
+
+    x = selected.values('x', position, located=True)
+    if not len(x):
+        return fig
+    x, y, z = positionplot.density(x, selected.values('y', position, located=True))
+    fig.add_trace(go.Contour(
+        x=x, y=y, z=z,
+        colorscale=['white', color_dict[position]], opacity=0.8, ncontours=10,
+        contours=dict(
+            showlines=False,
+            coloring='fill', showlabels=True
+        ),
+        showscale = False))
+    return fig
+
+
+def figures(events, baselines, distribution, contour):
+    '''
+    :param distribution: positionplot._distribution or reference_distribution
+    :param contour: positionplot.plot_contour or reference_contour
+    :return: list of (name, figure) of every plot_* call for every position group and axis
+    '''
+    selected = selection(events)
+    out = []
+    for position in position_id_dict:
+        out.append((f'contour {position}', contour(selected, position)))
+        for ax, (max, ax_name) in enumerate(((120, 'depth'), (80, 'width'))):
+            for action, name, title, size in (('defence', 'defence', 'defence', None),
+                                              ('ball receipt', 'receipt', 'ball receipt', None),
+                                              ('shot', 'shot', 'shot', 0.5)):
+                values = selected.values('xy'[ax], position, action, located=True)
+                out.append((f'{title} {ax_name} {position}',
+                            distribution(f'{position} {title} {ax_name}', values, name, position, ax, max=max,
+                                         size=size, registry=baselines)))
+        for column, action, name, axis, title in (('pass_length', 'pass', 'pass', 'length', 'passing length'),
+                                                  ('pass_angle', 'pass', 'pass', 'angle', 'passing angle'),
+                                                  ('duration', 'carry', 'carry', 'duration', 'carry duration(s)')):
+            values = selected.values(column, position, action)
+            out.append((f'{title} {position}',
+                        distribution(f'{position} {title}', values, name, position, axis, registry=baselines)))
+    return out
+
+
+def to_json(figure):
+    if not isinstance(figure, dict):
+        figure = figure.to_plotly_json()
+    return json.loads(json.dumps(figure, cls=PlotlyJSONEncoder))
+
+
+def check_public_functions(events, baselines):
+    '''
+    The public plot_* functions must build the same figures as _distribution with their titles.
+    '''
+    selected = selection(events)
+    pairs = [(positionplot.plot_defence(selected, 'fullback', 1, registry=baselines),
+              positionplot._distribution('fullback defence width', selected.values('y', 'fullback', 'defence', True),
+                                         'defence', 'fullback', 1, max=80, registry=baselines)),
+             (positionplot.plot_shot(selected, 'striker', 0, registry=baselines),
+              positionplot._distribution('striker shot depth', selected.values('x', 'striker', 'shot', True),
+                                         'shot', 'striker', 0, max=120, size=0.5, registry=baselines)),
+             (positionplot.plot_carry(selected, 'winger', registry=baselines),
+              positionplot._distribution('winger carry duration(s)', selected.values('duration', 'winger', 'carry'),
+                                         'carry', 'winger', 'duration', registry=baselines))]
+    return all(to_json(a) == to_json(b) for a, b in pairs)
+
+
+def best_of(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check and benchmark the position matrix figures.')
+    parser.add_argument('match_ids', type=int, nargs='*')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    season = registry.default()
+    match_ids = args.match_ids or [match['match_id'] for match in season.matches[:3]]
+
+    print(f'{"match":>8} {"team":>24} {"figures":>8} {"dicts":>10} {"go.Figure":>10}')
+    for match_id in match_ids:
+        bundle = get_match_bundle(match_id)
+        for team in season.teams(match_id):
+            events = bundle.selection(team)
+            new = figures(events, season.baselines, positionplot._distribution, positionplot.plot_contour)
+            old = figures(events, season.baselines, reference_distribution, reference_contour)
+            for (name, a), (_, b) in zip(new, old):
+                if to_json(a) != to_json(b):
+                    raise SystemExit(f'{name} of {team} in match {match_id} differs from the go.Figure implementation')
+            if not check_public_functions(events, season.baselines):
+                raise SystemExit(f'plot_* functions of {team} in match {match_id} differ from _distribution')
+
+            fast = best_of(lambda: figures(events, season.baselines, positionplot._distribution,
+                                           positionplot.plot_contour), args.repeat)
+            slow = best_of(lambda: figures(events, season.baselines, reference_distribution, reference_contour),
+                           args.repeat)
+            print(f'{match_id:>8} {team[:24]:>24} {len(new):>8} {fast * 1e3:>8.1f}ms {slow * 1e3:>8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+'''
+Build the "all matches" baselines of the position matrix of a season
+(baselines/{competition_id}/{season_id}/baselines.bin).
+
+Every match is read once, from the columnar event store (converted on the fly when missing), and all
+five datasets are extracted for all position groups in that single pass. Matches run in parallel on a
+process pool and the baseline file is replaced atomically once every match is done.
+
+    python build_baselines.py [--competition 72 --season 107] [--workers 8] [--out-dir DIR]
+'''
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import eventstore
+from baselines import season_dir, write_baselines
+from positionplot import action_dict, position_id_dict
+
+# Baseline file name, action it is drawn from and whether the action needs a location
+BASELINES = [('receipt', 'ball receipt', True),
+             ('defence', 'defence', True),
+             ('pass', 'pass', False),
+             ('shot', 'shot', False),
+             ('carry', 'carry', False)]
+
+
+def extract_match(match_id, store_dir=None):
+    '''
+    :param match_id: Statsbomb match id
+    :return: dict of baseline name to a dict of position group to that match's values
+    '''
+    if not eventstore.has_match(match_id, store_dir):
+        eventstore.convert_match(match_id, store_dir)
+    c = eventstore.load_match(match_id, store_dir)
+    located = ~np.isnan(c['x'])
+
+    out = {name: {} for name, _, _ in BASELINES}
+    for position, position_ids in position_id_dict.items():
+        in_position = np.isin(c['position_id'], position_ids)
+        for name, action, needs_location in BASELINES:
+            rows = in_position & np.isin(c['type_id'], action_dict[action])
+            if needs_location:
+                rows &= located
+            if name == 'pass':
+                values = [{'length': l, 'angle': a}
+                          for l, a in zip(c['pass_length'][rows].tolist(), c['pass_angle'][rows].tolist())]
+            elif name == 'carry':
+                values = c['duration'][rows].tolist()
+            else:
+                values = np.stack([c['x'][rows], c['y'][rows]], axis=1).tolist()
+            out[name][position] = values
+    return out
+
+
+def build(match_ids, out_dir, workers=None, store_dir=None):
+    '''
+    :param match_ids: matches to aggregate, in the order their values are concatenated
+    :param out_dir: directory receiving baselines.bin
+    :param workers: size of the process pool, defaults to the number of CPUs
+    :return: dict of baseline name to position group to values
+    '''
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        per_match = list(pool.map(extract_match, match_ids, [store_dir] * len(match_ids)))
+
+    baselines = {name: {position: [v for m in per_match for v in m[name][position]]
+                        for position in position_id_dict}
+                 for name, _, _ in BASELINES}
+
+    write_baselines(baselines, out_dir)
+    return baselines
+
+
+def main(argv=None):
+    from eventcache import load_matches
+
+    parser = argparse.ArgumentParser(description='Build the all-matches baselines of the position matrix.')
+    parser.add_argument('--competition', type=int, default=72)
+    parser.add_argument('--season', type=int, default=107)
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (default: CPU count)')
+    parser.add_argument('--out-dir', default=None,
+                        help='output directory (default: the season directory under baselines/)')
+    parser.add_argument('--store-dir', default=None)
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    match_ids = [m['match_id'] for m in load_matches(args.competition, args.season)]
+    build(match_ids, args.out_dir or season_dir(args.competition, args.season), args.workers, args.store_dir)
+    print(f'Built baselines of {len(match_ids)} matches in {time.time() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
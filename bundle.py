@@ -0,0 +1,183 @@
+'''
+Derived state of a match, computed once per upstream event file and persisted.
+
+A match bundle holds for both teams: the rows of every get_events category and the build-up rows of
+each shot, the position group and action of every event for the position matrix, and the formation
+changes. It only depends on the event file, so it is keyed by match id and the sha256 of that file
+and stored as STORE_DIR/bundles/{match_id}-{sha[:16]}.npz. It is built on the first view of a match;
+later callbacks load it and only render.
+'''
+import glob
+import os
+
+import numpy as np
+
+import eventstore
+from eventcache import get_match_table, match_events_cache
+from positionplot import Selection, action_dict, position_id_dict
+from tacticplot import classify_rows, formation_changes, rows_to_events, table_layers
+
+# Bumped whenever what a bundle holds or how it is derived changes, so older bundles are rebuilt
+BUNDLE_VERSION = 2
+
+POSITIONS = list(position_id_dict)
+ACTIONS = list(action_dict)
+
+
+def bundle_path(match_id, sha256, store_dir=None):
+    return os.path.join(store_dir or eventstore.STORE_DIR, 'bundles', f'{match_id}-{sha256[:16]}.npz')
+
+
+def _ragged(arrays):
+    '''
+    :return: (concatenated values, offsets) of a list of int arrays
+    '''
+    offsets = np.cumsum([0] + [len(a) for a in arrays]).astype(np.int32)
+    values = np.concatenate(arrays).astype(np.int32) if arrays else np.zeros(0, dtype=np.int32)
+    return values, offsets
+
+
+def _split(values, offsets):
+    return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def _codes(masks, names):
+    '''
+    :return: int8 array holding the index in names of the mask each row is in, -1 for none
+    '''
+    codes = np.full(len(next(iter(masks.values()))), -1, dtype=np.int8)
+    for i, name in enumerate(names):
+        codes[masks[name]] = i
+    return codes
+
+
+def build_arrays(table):
+    '''
+    :param table: EventTable of a whole match
+    :return: dict of name to NumPy array, the persisted form of a bundle
+    '''
+    arrays = {'version': np.array(BUNDLE_VERSION), 'source_sha256': np.array(table.source_sha256)}
+    for k, team_id in enumerate(table['team_ids'].tolist()):
+        prefix = f'team{k}_'
+        rows = np.flatnonzero(table.team_mask(team_id))
+        team = table.take(rows)
+        arrays[prefix + 'id'] = np.array(team_id, dtype=np.int32)
+        arrays[prefix + 'rows'] = rows.astype(np.int32)
+
+        categories, goal_windows, no_goal_windows = classify_rows(team)
+        for j, category in enumerate(categories):
+            arrays[f'{prefix}category{j}'] = category.astype(np.int32)
+        arrays[prefix + 'goal_windows'], arrays[prefix + 'goal_offsets'] = _ragged(list(goal_windows.values()))
+        arrays[prefix + 'no_goal_windows'], arrays[prefix + 'no_goal_offsets'] = \
+            _ragged(list(no_goal_windows.values()))
+
+        selection = Selection(team)
+        arrays[prefix + 'position'] = _codes(selection.position_masks, POSITIONS)
+        arrays[prefix + 'action'] = _codes(selection.action_masks, ACTIONS)
+
+        # Formation changes need the Starting XI; without it the formation plot is left to fail as before
+        if len(categories[6]):
+            start_ids, changes = formation_changes(rows_to_events(team, categories, goal_windows, no_goal_windows))
+            arrays[prefix + 'start_ids'] = np.array(start_ids, dtype=np.int8)
+            arrays[prefix + 'shift_time'] = np.array([(m, s) for m, s, _ in changes], dtype=np.int16).reshape(-1, 2)
+            arrays[prefix + 'shift_ids'], arrays[prefix + 'shift_offsets'] = \
+                _ragged([np.array(ids) for _, _, ids in changes])
+    return arrays
+
+
+class MatchBundle:
+    '''
+    Derived state of a match over its EventTable, see build_arrays.
+    '''
+
+    def __init__(self, table, arrays):
+        '''
+        :param table: EventTable of the whole match
+        :param arrays: dict returned by build_arrays
+        '''
+        self.table = table
+        self.arrays = arrays
+        names = table.team_ids()
+        self._teams = {}
+        for k in range(len(names)):
+            team_id = int(arrays[f'team{k}_id'])
+            self._teams[team_id] = self._teams[names[team_id]] = f'team{k}_'
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def team_table(self, team):
+        '''
+        :param team: team name or id
+        :return: EventTable of the team's events
+        '''
+        return self.table.take(self.arrays[self._teams[team] + 'rows'])
+
+    def _rows(self, team):
+        '''
+        :return: (category rows, goal windows, no goal windows) of a team, as classify_rows
+        '''
+        prefix = self._teams[team]
+        categories = [self.arrays[f'{prefix}category{j}'] for j in range(8)]
+        goal_windows = dict(zip(categories[0].tolist(), _split(self.arrays[prefix + 'goal_windows'],
+                                                               self.arrays[prefix + 'goal_offsets'])))
+        no_goal_windows = dict(zip(categories[1].tolist(), _split(self.arrays[prefix + 'no_goal_windows'],
+                                                                  self.arrays[prefix + 'no_goal_offsets'])))
+        return categories, goal_windows, no_goal_windows
+
+    def layers(self, team):
+        '''
+        :return: tacticplot.tactic_layers of a team, read from the columns without building event dicts
+        '''
+        return table_layers(self.team_table(team), *self._rows(team))
+
+    def selection(self, team):
+        '''
+        :return: positionplot.Selection of a team, from the stored position and action of every event
+        '''
+        prefix = self._teams[team]
+        positions, actions = self.arrays[prefix + 'position'], self.arrays[prefix + 'action']
+        return Selection(self.team_table(team),
+                         position_masks={name: positions == i for i, name in enumerate(POSITIONS)},
+                         action_masks={name: actions == i for i, name in enumerate(ACTIONS)})
+
+    def formation(self, team):
+        '''
+        :return: (starting XI position ids, list of (minute, second, position ids)) as formation_changes,
+                 None if the team has no Starting XI
+        '''
+        prefix = self._teams[team]
+        if prefix + 'start_ids' not in self.arrays:
+            return None
+        shifts = _split(self.arrays[prefix + 'shift_ids'], self.arrays[prefix + 'shift_offsets'])
+        return (self.arrays[prefix + 'start_ids'].tolist(),
+                [(m, s, ids.tolist()) for (m, s), ids in zip(self.arrays[prefix + 'shift_time'].tolist(), shifts)])
+
+
+def get_match_bundle(match_id, store_dir=None):
+    '''
+    Bundle of a match, from the in-process LRU, else from disk, else built and persisted.
+    :param match_id: Statsbomb match id
+    :return: MatchBundle
+    '''
+    table = get_match_table(match_id)
+    sha = table.source_sha256
+
+    def load():
+        path = bundle_path(match_id, sha, store_dir)
+        arrays = eventstore.load_columns(path) if os.path.exists(path) else None
+        if arrays is None or int(arrays['version']) != BUNDLE_VERSION:
+            arrays = build_arrays(table)
+            eventstore.save_columns(path, arrays)
+            for stale in glob.glob(bundle_path(match_id, '*', store_dir)):
+                if stale != path:
+                    try:
+                        os.unlink(stale)
+                    except FileNotFoundError:
+                        # Removed by another process rebuilding the same match
+                        pass
+        bundle = MatchBundle(table, arrays)
+        return bundle, bundle.nbytes
+
+    return match_events_cache.get_or_load(('bundle', int(match_id), sha), load)
@@ -0,0 +1,221 @@
+'''
+Indexed match list of a competition season.
+
+A MatchCatalog boots from a local snapshot of the match list (snapshots/{competition_id}/{season_id}.json,
+written by running this module) or else from the disk cache, so starting a worker never waits for the
+network. With neither, it boots empty and the first background refresh loads the list. Upstream is
+checked in a background thread and a changed match list is indexed off to the side and swapped in with
+a single assignment; readers always see one complete index. Write or update snapshots with:
+
+    python catalog.py                     # World Cup 2023
+    python catalog.py 72/107 43/106       # selected seasons
+'''
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from eventcache import (MAX_AGE, fetch_cached, is_cached, load_matches, matches_url, read_meta, revalidate,
+                        write_atomic)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.environ.get('STATSBOMB_SNAPSHOT_DIR',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+
+
+def snapshot_path(competition_id, season_id, snapshot_dir=None):
+    return os.path.join(snapshot_dir or SNAPSHOT_DIR, str(competition_id), f'{season_id}.json')
+
+
+class MatchIndex:
+    '''
+    Immutable lookups over one version of a match list.
+    '''
+
+    def __init__(self, matches, sha256):
+        '''
+        :param matches: match list as published by Statsbomb
+        :param sha256: hash of the published file the list was read from
+        '''
+        self.matches = matches
+        self.sha256 = sha256
+        self.by_id = {match['match_id']: match for match in matches}
+
+        # Stages in the order they were played; group stage matches sorted by id, others as published
+        by_stage = {}
+        for match in sorted(matches, key=lambda m: m['match_date']):
+            by_stage.setdefault(match['competition_stage']['name'], [])
+        for match in matches:
+            by_stage[match['competition_stage']['name']].append(match['match_id'])
+        if 'Group Stage' in by_stage:
+            by_stage['Group Stage'].sort()
+        self.by_stage = {stage: tuple(ids) for stage, ids in by_stage.items()}
+
+        by_team, by_date = {}, {}
+        for match in matches:
+            for team in (match['home_team']['home_team_name'], match['away_team']['away_team_name'],
+                         match['home_team']['home_team_id'], match['away_team']['away_team_id']):
+                by_team.setdefault(team, []).append(match['match_id'])
+            by_date.setdefault(match['match_date'], []).append(match['match_id'])
+        self.by_team = {team: tuple(ids) for team, ids in by_team.items()}
+        self.by_date = {date: tuple(ids) for date, ids in by_date.items()}
+
+
+class MatchCatalog:
+    '''
+    Match list of one competition season, indexed by id, stage, team and date.
+    '''
+
+    def __init__(self, competition_id, season_id, snapshot_dir=None):
+        self.competition_id = competition_id
+        self.season_id = season_id
+        self.key = f'matches/{competition_id}/{season_id}'
+        self.url = matches_url(competition_id, season_id)
+        self.snapshot = snapshot_path(competition_id, season_id, snapshot_dir)
+        self.checked = 0
+        self._index = self._boot()
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _boot(self):
+        '''
+        :return: MatchIndex from the snapshot, else from the disk cache, else an empty one
+        '''
+        try:
+            with open(self.snapshot, 'rb') as f:
+                raw = f.read()
+            return MatchIndex(json.loads(raw), hashlib.sha256(raw).hexdigest())
+        except FileNotFoundError:
+            pass
+        if is_cached(self.key):
+            matches = load_matches(self.competition_id, self.season_id)
+            meta = read_meta(self.key)
+            self.checked = meta['checked']
+            return MatchIndex(matches, meta['sha256'])
+        # Never checked, so the first refresh_in_background loads the list
+        logger.warning('No snapshot or cached match list of %s/%s, loading it in the background',
+                       self.competition_id, self.season_id)
+        return MatchIndex([], None)
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def matches(self):
+        return self._index.matches
+
+    @property
+    def nbytes(self):
+        '''
+        :return: size of the published match list, an estimate of the memory the catalog holds
+        '''
+        meta = read_meta(self.key)
+        if meta is not None:
+            return meta['size']
+        return os.path.getsize(self.snapshot) if os.path.exists(self.snapshot) else 0
+
+    def match(self, match_id):
+        return self._index.by_id[int(match_id)]
+
+    def __contains__(self, match_id):
+        return int(match_id) in self._index.by_id
+
+    def stages(self):
+        '''
+        :return: dict of stage name to match ids, in the order the stages were played
+        '''
+        return self._index.by_stage
+
+    def team_matches(self, team):
+        '''
+        :param team: team name or id
+        :return: ids of the matches the team played
+        '''
+        return self._index.by_team.get(team, ())
+
+    def date_matches(self, date):
+        '''
+        :param date: 'YYYY-MM-DD'
+        :return: ids of the matches played that day
+        '''
+        return self._index.by_date.get(date, ())
+
+    def refresh(self):
+        '''
+        Check upstream now and swap in a new index if the match list changed.
+        :return: True if the index was replaced
+        '''
+        meta = revalidate(self.key, self.url)
+        self.checked = time.time()
+        if meta['sha256'] == self._index.sha256:
+            return False
+        index = MatchIndex(json.loads(fetch_cached(self.key, self.url)), meta['sha256'])
+        self._index = index
+        logger.info('Match list of %s/%s updated', self.competition_id, self.season_id)
+        return True
+
+    def ensure_loaded(self):
+        '''
+        Load the match list now if the catalog booted empty, for callers that need the matches; starting
+        the app never waits for this.
+        :return: True if the catalog has matches
+        '''
+        if not self._index.matches:
+            try:
+                self.refresh()
+            except (requests.RequestException, LookupError, ValueError):
+                logger.warning('Loading %s failed, the match list stays empty', self.key)
+        return bool(self._index.matches)
+
+    def refresh_in_background(self, max_age=MAX_AGE):
+        '''
+        Start a refresh in a daemon thread if the index was not checked for max_age seconds.
+        '''
+        with self._lock:
+            if self._refreshing or time.time() - self.checked < max_age:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except (requests.RequestException, LookupError, ValueError):
+                logger.warning('Refresh of %s failed, keeping current match list', self.key)
+                self.checked = time.time()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def write_snapshot(self):
+        '''
+        Save the current upstream match list as the snapshot the next start boots from.
+        '''
+        meta = revalidate(self.key, self.url)
+        write_atomic(self.snapshot, fetch_cached(self.key, self.url))
+        return meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write match list snapshots the app boots from.')
+    parser.add_argument('seasons', nargs='*', default=['72/107'], help="'competition_id/season_id' pairs")
+    parser.add_argument('--snapshot-dir', default=None, help=f'output directory (default: {SNAPSHOT_DIR})')
+    args = parser.parse_args(argv)
+
+    for season in args.seasons:
+        competition_id, season_id = (int(part) for part in season.split('/'))
+        catalog = MatchCatalog(competition_id, season_id, args.snapshot_dir)
+        catalog.write_snapshot()
+        print(catalog.snapshot)
+
+
+if __name__ == '__main__':
+    main()
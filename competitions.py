@@ -0,0 +1,189 @@
+'''
+Registry of the Statsbomb competition seasons the app serves.
+
+A season's match catalog (see catalog.py) is loaded on first use and kept in a byte-bounded LRU, so
+memory stays flat as seasons are added: a season that has not been viewed for a while is dropped
+together with its baseline mapping and booted again from its snapshot when it is selected again. Every season has its own namespace,
+'{competition_id}/{season_id}', for its cached match list and its baselines directory.
+
+STATSBOMB_SEASONS lists the seasons offered, e.g. '72/107,43/106'; the first one is the default.
+'''
+import logging
+import os
+import threading
+
+from baselines import BaselineRegistry, season_dir
+from catalog import MatchCatalog
+from eventcache import DECODED_FACTOR, is_cached, load_competitions
+from lrucache import LRUCache
+from warmup import DEFAULT_MATCH, priority_order
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEASONS = '72/107'
+
+# Seasons kept loaded, bounded by STATSBOMB_SEASONS_MB
+SEASONS_MAX_BYTES = int(float(os.environ.get('STATSBOMB_SEASONS_MB', 32)) * 2**20)
+
+# Country names shortened in match names of international competitions
+COUNTRY_NAMES = {'Korea\xa0(South)': 'South Korea', 'United States of America': 'USA'}
+
+
+def parse_seasons(value):
+    '''
+    :param value: comma separated 'competition_id/season_id' pairs
+    :return: list of (competition_id, season_id) tuples
+    '''
+    seasons = []
+    for item in value.split(','):
+        if item.strip():
+            competition_id, season_id = item.strip().split('/')
+            seasons.append((int(competition_id), int(season_id)))
+    return seasons
+
+
+def team_name(name):
+    '''
+    :param name: Statsbomb team name, e.g. "Spain Women's"
+    :return: name shown in the app, e.g. 'Spain'
+    '''
+    for suffix in (" Women's", " Men's"):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+class Season:
+    '''
+    One competition season: its match catalog, menu structure and baselines.
+    '''
+
+    def __init__(self, competition_id, season_id, catalog=None):
+        '''
+        :param catalog: MatchCatalog of the season, booted from its snapshot if not given
+        '''
+        self.competition_id = competition_id
+        self.season_id = season_id
+        self.namespace = f'{competition_id}/{season_id}'
+        self.catalog = catalog or MatchCatalog(competition_id, season_id)
+        self.baselines = BaselineRegistry(season_dir(competition_id, season_id))
+
+    @property
+    def matches(self):
+        return self.catalog.matches
+
+    def match(self, match_id):
+        return self.catalog.match(match_id)
+
+    def __contains__(self, match_id):
+        return match_id in self.catalog
+
+    def teams(self, match_id):
+        '''
+        :return: tuple of the home and away team names of a match
+        '''
+        match = self.match(match_id)
+        return match['home_team']['home_team_name'], match['away_team']['away_team_name']
+
+    def match_name(self, match_id):
+        '''
+        :return: 'Home vs. Away', with country names for international competitions
+        '''
+        match = self.match(match_id)
+        if match['competition']['country_name'] == 'International':
+            home = match['home_team']['country']['name']
+            away = match['away_team']['country']['name']
+            home, away = COUNTRY_NAMES.get(home, home), COUNTRY_NAMES.get(away, away)
+        else:
+            home, away = (team_name(name) for name in self.teams(match_id))
+        return f'{home} vs. {away}'
+
+    def stages(self):
+        '''
+        :return: list of (stage name, match ids as str) in the order the stages were played
+        '''
+        return [(stage, [str(match_id) for match_id in ids]) for stage, ids in self.catalog.stages().items()]
+
+    def default_match(self):
+        '''
+        :return: match shown when the season is selected, None while the match list is still loading
+        '''
+        if not self.matches:
+            return None
+        if DEFAULT_MATCH in self.catalog:
+            return DEFAULT_MATCH
+        return priority_order(self.matches, None)[0]
+
+
+class CompetitionRegistry:
+    '''
+    The seasons offered by the app, loaded lazily and kept in a byte-bounded LRU.
+    '''
+
+    def __init__(self, seasons, max_bytes=SEASONS_MAX_BYTES):
+        '''
+        :param seasons: list of (competition_id, season_id) tuples, the first one is the default
+        :param max_bytes: budget of the loaded seasons, weighed like decoded event files
+        '''
+        self.seasons = list(seasons)
+        self._cache = LRUCache(max_bytes)
+        self._names = None
+        self._fetching = False
+
+    def get(self, competition_id, season_id):
+        '''
+        :return: Season, booted from its snapshot or the disk cache if it is not in memory
+        '''
+        def load():
+            season = Season(competition_id, season_id)
+            return season, season.catalog.nbytes * DECODED_FACTOR
+
+        season = self._cache.get_or_load((int(competition_id), int(season_id)), load)
+        season.catalog.refresh_in_background()
+        return season
+
+    def default(self):
+        return self.get(*self.seasons[0])
+
+    def resolve(self, key):
+        '''
+        :param key: 'competition_id/season_id' or 'competition_id/season_id/match_id'
+        :return: (Season, match id or None)
+        '''
+        parts = [int(part) for part in str(key).split('/')]
+        return self.get(parts[0], parts[1]), (parts[2] if len(parts) > 2 else None)
+
+    def names(self):
+        '''
+        :return: dict of 'competition_id/season_id' to a display name, e.g. "Women's World Cup 2023". Until
+                 the Statsbomb competition list is on disk, seasons get generic names and the list is
+                 fetched in the background
+        '''
+        if self._names is not None:
+            return self._names
+        published = {}
+        if is_cached('competitions'):
+            try:
+                published = {(c['competition_id'], c['season_id']): f"{c['competition_name']} {c['season_name']}"
+                             for c in load_competitions()}
+            except Exception:
+                logger.exception('Could not load the Statsbomb competition list')
+        elif not self._fetching:
+            self._fetching = True
+            threading.Thread(target=self._fetch_competitions, daemon=True).start()
+        names = {f'{c}/{s}': published.get((c, s), f'Competition {c}, season {s}') for c, s in self.seasons}
+        if published:
+            self._names = names
+        return names
+
+    def _fetch_competitions(self):
+        try:
+            load_competitions()
+        except Exception as e:
+            logger.warning('Could not load the Statsbomb competition list: %s', e)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+registry = CompetitionRegistry(parse_seasons(os.environ.get('STATSBOMB_SEASONS', DEFAULT_SEASONS)))
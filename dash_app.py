@@ -1,62 +1,84 @@
+import logging
+import multiprocessing
+import os
+
 import dash
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input,Output
-import requests
-
-from tacticplot import plot, plot2, get_events, formation, formation2
-from positionplot import (plot_contour, plot_ballreceipt, plot_defence,
-                          plot_passlength, plot_passangle, plot_shot, plot_carry)
-
-def load_json(url):
-    '''
-    Load json data from the given URL.
-    '''
-    response = requests.get(url)
-    return response.json()
-
-# Load the URL of match data for World Cup 2023 from Statsbomb
-url_WC_2023 = 'https://raw.githubusercontent.com/statsbomb/open-data/master/data/matches/72/107.json'
-json_data_2023 = load_json(url_WC_2023)
-
-# Sort stage group for user to select match
-stage_dict = {}
-for match in json_data_2023:
-    stage_name = match['competition_stage']['name']
-    match_id = str(match['match_id'])
-    
-    if stage_name not in stage_dict:
-        stage_dict[stage_name] = []
-    stage_dict[stage_name].append(match_id)
-
-stage_dict['Group Stage'] = sorted(stage_dict['Group Stage'])
+from dash.dependencies import Input,Output,ALL
 
-# Pair match id and match name for user to select match
-match_dict = {str(match["match_id"]): 
-    f"{match['home_team']['country']['name']} vs. {match['away_team']['country']['name']}"
-    for match in json_data_2023}
+from competitions import registry, team_name
+from eventcache import match_events_cache
+from figurecache import CODE_VERSION, figure_cache
+from prerender import load_view, read_manifest
+from views import MATRIX, matrix_figures, plot_figures
+from warmup import Warmup
 
-match_dict = {key: value.replace('Korea\xa0(South)', 'South Korea') for key, value in match_dict.items()}
-match_dict = {key: value.replace('United States of America', 'USA') for key, value in match_dict.items()}
+logger = logging.getLogger(__name__)
 
-# Get a full list of match ids
-match_list = [str(match['match_id']) for match in json_data_2023]
-
-# Get a dictionary with match ids as keys and a tuple of both teams in that match as value
-team_dict = {match['match_id']: 
-    (match['home_team']['home_team_name'], match['away_team']['away_team_name'])
-    for match in json_data_2023}
+# Competition seasons offered by the app, each loaded from Statsbomb through the disk cache on first use
+default_season = registry.default()
 
 # Build the app
 app = Dash(__name__, external_stylesheets=[dbc.themes.CERULEAN],
           meta_tags=[{"name": "viewport", "content": "width=device-width,"
                       "initial-scale=1, maximum-scale=1"}])
 
-app.title = "World Cup 2023 Data Visualization"
+app.title = f"{registry.names()[default_season.namespace]} Data Visualization"
 
 server = app.server
 app.config.suppress_callback_exceptions = True
 
+@server.route('/cache-stats')
+def cache_stats():
+    '''
+    :return: hit/miss/eviction counters of the shared match event cache and of the figure cache
+    '''
+    return {'events': match_events_cache.stats(), 'seasons': registry.stats(), 'figures': figure_cache.stats()}
+
+# With a pre-fork server (gunicorn --preload), load the baselines once in the master so workers share them
+if os.environ.get('STATSBOMB_PRELOAD', '').lower() in ('1', 'true', 'yes'):
+    default_season.baselines.preload()
+
+# With STATSBOMB_PREBUILT, serve the figures prerender.py wrote and build none
+PREBUILT = os.environ.get('STATSBOMB_PREBUILT', '').lower() in ('1', 'true', 'yes')
+if PREBUILT and multiprocessing.parent_process() is None:
+    for competition_id, season_id in registry.seasons:
+        manifest = read_manifest(competition_id, season_id)
+        if manifest is None or manifest['code_version'] != CODE_VERSION:
+            logger.warning('Prebuilt figures of season %s/%s are missing or were rendered by other code: run '
+                           'python prerender.py --competition %s --season %s',
+                           competition_id, season_id, competition_id, season_id)
+
+# Optionally fetch and pre-process every match in the background so first views are cache hits. Figure
+# worker processes import this module too when the app runs as a script; they never warm up.
+warmup = None
+if (os.environ.get('STATSBOMB_WARMUP', '').lower() in ('1', 'true', 'yes') and not PREBUILT
+        and multiprocessing.parent_process() is None):
+    warmup = Warmup(default_season, workers=int(os.environ.get('STATSBOMB_WARMUP_WORKERS', 4))).start()
+
+@server.route('/warmup')
+def warmup_progress():
+    '''
+    :return: progress of the background warm-up
+    '''
+    return warmup.progress() if warmup else {'enabled': False}
+
+def intro(season_key):
+    '''
+    :param season_key: 'competition_id/season_id'
+    :return: introduction text naming the season
+    '''
+    return (f"Great appreciation towards Statsbomb for sharing valuable data of the {registry.names()[season_key]}. "
+            "This project visualizes the data with an emphasis on team tactics.")
+
+def baseline_note(season_key):
+    '''
+    :return: note on the grey "all matches" baselines of the position matrix of the season
+    '''
+    return ("Grey area in plots shows distribution of selected action executed by selected position"
+            f" in all {registry.names()[season_key]} matches.")
+
 def description_card():
     '''
     :return: An HTML Div element introducing the app.
@@ -73,9 +95,7 @@ def description_card():
 
             html.Div(
                 id="intro",
-                children="Great appreciation towards Statsbomb for sharing valuable data of the "
-                         "Women's World Cup 2023, as part of their commitment to support women's soccer. "
-                         "This project visualizes the data with an emphasis on team tactics.",
+                children=intro(default_season.namespace),
                 style={"font-size": "14px"}
 
             ),
@@ -85,273 +105,64 @@ def description_card():
         ],
     )
 
-def game_select_card():
+def match_menu(season):
     '''
-    :return: An HTML Div element providing accordion menu for match selection.
-    :rtype: dash_html_components.Div
+    :param season: competitions.Season
+    :return: accordion with one item per stage of the season and one button per match
     '''
-    return html.Div([
-        dbc.Accordion(
-          [
-            dbc.AccordionItem(
-                className= "accordion-title",
-                children =
-                [
-                    html.Button(match_dict[match], id=match, style={'width': '48%', 'font-size': '13px',
-                                                                    "margin-left": "-13px", "margin-right": "15px"},
-                               className="border-0 bg-light font-weight-light my-0")
-                    for match in stage_dict['Group Stage']
-                ],
-                title="Group Stage"
-            ),
-            dbc.AccordionItem(
-                [
-                    html.Button(match_dict[match], id=match, style={'width': '48%', 'font-size': '13px',
-                                                                    "margin-left": "-13px", "margin-right": "15px"},
-                               className="border-0 bg-light font-weight-light my-0")
-                    for match in stage_dict['Round of 16']
-                ],
-                title="Round of 16"
-            ),
-            dbc.AccordionItem(
-                [
-                    html.Button(match_dict[match], id=match, style={'width': '48%', 'font-size': '13px',
-                                                                    "margin-left": "-13px", "margin-right": "15px"},
-                               className="border-0 bg-light font-weight-light my-0")
-                    for match in stage_dict['Quarter-finals']
-                ],
-                title="Quarter-finals"
-            ),
-            dbc.AccordionItem(
-                [
-                    html.Button(match_dict[match], id=match, style={'width': '48%', 'font-size': '13px',
-                                                                    "margin-left": "-13px", "margin-right": "15px"},
-                               className="border-0 bg-light font-weight-light my-0")
-                    for match in stage_dict['Semi-finals']
-                ],
-                title="Semi-finals"
-            ),
-            dbc.AccordionItem(
-                [
-                    html.Button(match_dict[match], id=match, style={'width': '46%', 'font-size': '13px',
-                                                                    "margin-left": "-13px", "margin-right": "15px"},
-                               className="border-0 bg-light font-weight-light my-0")
-                    for match in stage_dict['3rd Place Final']
-                ],
-                title="3rd Place Final"
-            ),
+    return dbc.Accordion(
+        [
             dbc.AccordionItem(
+                className="accordion-title",
+                children=
                 [
-                    html.Button(match_dict[match], id=match, style={'width': '46%', 'font-size': '13px',
-                                                                    "margin-left": "-13px", "margin-right": "15px"},
-                               className="border-0 bg-light font-weight-light my-0")
-                    for match in stage_dict['Final']
+                    html.Button(season.match_name(match),
+                                id={'type': 'match-button', 'index': f'{season.namespace}/{match}'},
+                                style={'width': '48%', 'font-size': '13px',
+                                       "margin-left": "-13px", "margin-right": "15px"},
+                                className="border-0 bg-light font-weight-light my-0")
+                    for match in matches
                 ],
-                title="Final"
-            ),
-          ], flush = True,
-        ),
+                title=stage
+            )
+            for stage, matches in season.stages()
+        ], flush = True,
+    )
+
+def game_select_card():
+    '''
+    :return: An HTML Div element providing a season selector and accordion menu for match selection.
+    :rtype: dash_html_components.Div
+    '''
+    return html.Div([
+        dcc.Dropdown(id="season-select",
+                     options=[{'label': name, 'value': key} for key, name in registry.names().items()],
+                     value=default_season.namespace, clearable=False,
+                     style={'display': 'block' if len(registry.seasons) > 1 else 'none',
+                            'margin-bottom': '10px'}),
+        html.Div(match_menu(default_season), id="match-menu"),
 
         html.Div(id="output-div", style={'display': 'none'}),
 
     ])
 
-def position_matrix(events):
-    return html.Div([
-        dbc.Row([
-            dbc.Col(
-                dcc.Graph(figure = plot_contour(events, 'centerback'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_defence(events, 'centerback', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_defence(events, 'centerback', 1),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_ballreceipt(events, 'centerback', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_ballreceipt(events, 'centerback', 1),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_passlength(events, 'centerback'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-
-        ], style = {'margin-top': '20px'}),
-        dbc.Row([
-            dbc.Col(
-                dcc.Graph(figure = plot_contour(events, 'fullback'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_defence(events, 'fullback', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_defence(events, 'fullback', 1),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_ballreceipt(events, 'fullback', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_ballreceipt(events, 'fullback', 1),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_passangle(events, 'fullback'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-
-        ], style={'margin-top': '20px'}),
-        dbc.Row([
-            dbc.Col(
-                dcc.Graph(figure = plot_contour(events, 'midfielder'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_defence(events, 'midfielder', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_defence(events, 'midfielder', 1),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_ballreceipt(events, 'midfielder', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure = plot_carry(events, 'midfielder'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_shot(events, 'midfielder', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-        ], style={'margin-top': '20px'}),
-        dbc.Row([
-            dbc.Col(
-                dcc.Graph(figure=plot_contour(events, 'winger'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_defence(events, 'winger', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_ballreceipt(events, 'winger', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_passangle(events, 'winger'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_carry(events, 'winger'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_shot(events, 'winger', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
+def position_matrix(figures):
+    '''
+    :param figures: the position matrix figures, in layout order
+    '''
+    figures = iter(figures)
 
-        ], style={'margin-top': '20px'}),
+    return html.Div([
         dbc.Row([
             dbc.Col(
-                dcc.Graph(figure=plot_contour(events, 'striker'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_ballreceipt(events, 'striker', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_ballreceipt(events, 'striker', 1),
+                dcc.Graph(figure=next(figures),
                           config={'displayModeBar': False}),
                 xs={'size': 12}, sm={'size': 12}, md={'size': 12},
                 lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_carry(events, 'striker'),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_shot(events, 'striker', 1),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-            dbc.Col(
-                dcc.Graph(figure=plot_shot(events, 'striker', 0),
-                          config={'displayModeBar': False}),
-                xs={'size': 12}, sm={'size': 12}, md={'size': 12},
-                lg={'size': 12}, xl={'size': 2}
-            ),
-
-        ], style={'margin-top': '20px'}),
+            )
+            for _ in cells
+        ], style={'margin-top': '20px'})
+        for position, cells in MATRIX
       ], style={'margin-bottom': '40px'}
     )
 
@@ -520,8 +331,7 @@ app.layout = dbc.Container(
                             html.P('All matches:',
                                    style={'margin-top': '10px', 'font-size': '14px', 'font-weight': 'bold'}),
                             html.P(
-                                "Grey area in plots shows distribution of selected action executed by selected position"
-                                " in all World Cup 2023 matches.",
+                                baseline_note(default_season.namespace), id="baseline-note",
                                 style={'font-size': '14px', 'margin-top': '-15px'}),
                             html.P('Plot direction:',
                                    style={'margin-top': '10px', 'font-size': '14px', 'font-weight': 'bold'}),
@@ -571,20 +381,38 @@ app.layout = dbc.Container(
 
     ])
 
-# Callback 1: Input - button click from match selection memu. Output - match id.
-input_matches = [Input(match, "n_clicks") for match in match_list]
+# Callback 0: Input - selected season. Output - match selection menu of that season and the texts naming it.
 @app.callback(
-    Output("output-div", "children"),
-    input_matches
+    Output("match-menu", "children"),
+    Output("intro", "children"),
+    Output("baseline-note", "children"),
+    [Input("season-select", "value")]
 )
-def get_match(*n_clicks_values):
-    clicked_match_id = dash.callback_context.triggered[0]["prop_id"].split(".")[0]
-    if not clicked_match_id:
-        match_id = 3906390
-    else:
-        match_id = int(clicked_match_id)
+def update_menu(season_key):
+    season, _ = registry.resolve(season_key)
+    season.catalog.ensure_loaded()
+    return match_menu(season), intro(season.namespace), baseline_note(season.namespace)
 
-    return match_id
+# Callback 1: Input - button click from match selection memu or season selection.
+# Output - 'competition_id/season_id/match_id' of the selected match.
+@app.callback(
+    Output("output-div", "children"),
+    [Input({'type': 'match-button', 'index': ALL}, "n_clicks"),
+     Input("season-select", "value")]
+)
+def get_match(n_clicks_values, season_key):
+    clicked = dash.callback_context.triggered_id
+    # Buttons of a freshly rendered menu trigger with n_clicks None; only a real click selects a match
+    if isinstance(clicked, dict) and dash.callback_context.triggered[0]['value']:
+        return clicked['index']
+
+    season, _ = registry.resolve(season_key)
+    # A season that booted without a match list loads it on its first view
+    season.catalog.ensure_loaded()
+    match_id = season.default_match()
+    if match_id is None:
+        raise dash.exceptions.PreventUpdate
+    return f'{season.namespace}/{match_id}'
 
 # Callback 2: Input - match id from callback 1. Output - a bunch of strings displayed in match overview.
 @app.callback(
@@ -601,21 +429,21 @@ def get_match(*n_clicks_values):
 )
 def get_info(selected_match):
     '''
-    :param selected_match: match id from callback 1
+    :param selected_match: 'competition_id/season_id/match_id' from callback 1
     :return: a bunch of strings
     '''
-    match_info = [m for m in json_data_2023 if m['match_id'] == selected_match][0]
+    season, match_id = registry.resolve(selected_match)
+    match_info = season.match(match_id)
     time = match_info['match_date']
     team1_score = match_info['home_score']
     team2_score = match_info['away_score']
     team1_manager = match_info['home_team']['managers'][0]['name']
     team2_manager = match_info['away_team']['managers'][0]['name']
 
-    team1 = team_dict[selected_match][0]
-    team2 = team_dict[selected_match][1]
+    team1, team2 = season.teams(match_id)
 
-    team1_name = ' '.join(team1.split()[:-1])
-    team2_name = ' '.join(team2.split()[:-1])
+    team1_name = team_name(team1)
+    team2_name = team_name(team2)
 
     team1_string = f"{team1_name} score: {team1_score}"
     team2_string = f"{team2_name} score: {team2_score}"
@@ -639,33 +467,21 @@ def get_info(selected_match):
 )
 def update_plot(selected_match):
     '''
-    :param selected_match: match id from callback 1
+    :param selected_match: 'competition_id/season_id/match_id' from callback 1
     :return: A tuple containing four plot figures.
     '''
-    match_id = int(selected_match)
-    team1 = team_dict[match_id][0]
-    team2 = team_dict[match_id][1]
-
-    team1_name = ' '.join(team1.split()[:-1])
-    team2_name = ' '.join(team2.split()[:-1])
+    season, match_id = registry.resolve(selected_match)
 
-    # Load event data from Statsbomb
-    url = f'https://raw.githubusercontent.com/statsbomb/open-data/master/data/events/{match_id}.json'
-    match_events = load_json(url)
-
-    # Get tuples of team actions using imported local module
-    team1_events = [event for event in match_events if event['team']['name'] == team1]
-    team1_tuples = get_events(team1_events)
-
-    team2_events = [event for event in match_events if event['team']['name'] == team2]
-    team2_tuples = get_events(team2_events)
-
-    # Generate plots using imported local module
-    fig1 = plot(team1_name, team1_tuples, team2_tuples)
-    fig2 = plot2(team2_name, team2_tuples, team1_tuples)
+    if PREBUILT:
+        figures = load_view(season.competition_id, season.season_id, match_id, 'plots')
+        if figures is None:
+            logger.warning('Match %s has not been prerendered', match_id)
+            raise dash.exceptions.PreventUpdate
+    else:
+        # Serve the figures from the figure cache, generating the missing ones concurrently on the figure pool
+        figures = plot_figures(season, match_id)
 
-    fig3 = formation(team1_name, team1_tuples)
-    fig4 = formation2(team2_name, team2_tuples)
+    fig1, fig2, fig3, fig4 = figures
 
     return fig1, fig2, fig3, fig4
     
@@ -687,19 +503,28 @@ def update_tab_labels(team1_position_string, team2_position_string):
     Input("output-div", 'children')]
 )
 def render_content(active_tab, selected_match):
-    match_id = int(selected_match)
-    team1 = team_dict[match_id][0]
-    team2 = team_dict[match_id][1]
-
-    url = f'https://raw.githubusercontent.com/statsbomb/open-data/master/data/events/{match_id}.json'
-    match_events = load_json(url)
+    season, match_id = registry.resolve(selected_match)
+    team1, team2 = season.teams(match_id)
 
     if active_tab =='tab-1':
-        events = [event for event in match_events if event['team']['name'] == team1]
+        team, view = team1, 'matrix1'
     elif active_tab =='tab-2':
-        events = [event for event in match_events if event['team']['name'] == team2]
-
-    return html.Div(position_matrix(events))
+        team, view = team2, 'matrix2'
+
+    if PREBUILT:
+        figures = load_view(season.competition_id, season.season_id, match_id, view)
+        if figures is None:
+            return html.P(f'This match has not been prerendered yet: run python prerender.py '
+                          f'--competition {season.competition_id} --season {season.season_id}',
+                          style={'margin': '20px'})
+        return html.Div(position_matrix(figures))
+
+    if not season.baselines.exists():
+        return html.P(f'The all matches baselines of this season have not been built yet: run '
+                      f'python build_baselines.py --competition {season.competition_id} --season {season.season_id}',
+                      style={'margin': '20px'})
+
+    return html.Div(position_matrix(matrix_figures(season, match_id, team)))
 
 if __name__ == '__main__':
     app.run_server(debug=True, port=1020)
\ No newline at end of file
@@ -0,0 +1,289 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+import eventstore
+import fetch
+from eventstream import FIELDS, iter_events
+from eventtable import EventTable
+from lrucache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Statsbomb open data location. Set STATSBOMB_BASE_URL to serve from a mirror instead of GitHub.
+BASE_URL = os.environ.get('STATSBOMB_BASE_URL',
+                          'https://raw.githubusercontent.com/statsbomb/open-data/master/data').rstrip('/')
+
+# Cached files live under CACHE_DIR, compressed, next to a small metadata file per key.
+CACHE_DIR = os.environ.get('STATSBOMB_CACHE_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache'))
+
+# Cached copies younger than MAX_AGE seconds are served without touching the network. Older ones are
+# served as they are while a background thread revalidates them with ETag / If-Modified-Since.
+# In OFFLINE mode the network is never used.
+MAX_AGE = float(os.environ.get('STATSBOMB_CACHE_MAX_AGE', 24 * 3600))
+OFFLINE = os.environ.get('STATSBOMB_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+# Event tables of matches shared by every callback in the process, bounded by STATSBOMB_LRU_MB and
+# weighed by their array sizes. DECODED_FACTOR times the source size bounds the memory of a decoded
+# match from above, for planning room before one is loaded.
+DECODED_FACTOR = 3
+match_events_cache = LRUCache(int(float(os.environ.get('STATSBOMB_LRU_MB', 256)) * 2**20))
+
+
+class CacheMiss(LookupError):
+    '''
+    Raised in offline mode when the requested file has never been cached.
+    '''
+
+
+def event_url(match_id):
+    return f'{BASE_URL}/events/{match_id}.json'
+
+
+def matches_url(competition_id, season_id):
+    return f'{BASE_URL}/matches/{competition_id}/{season_id}.json'
+
+
+def competitions_url():
+    return f'{BASE_URL}/competitions.json'
+
+
+def _meta_path(key):
+    return os.path.join(CACHE_DIR, f'{key}.meta.json')
+
+
+def _data_path(key, sha):
+    return os.path.join(CACHE_DIR, f'{key}-{sha[:16]}.json.gz')
+
+
+def write_atomic(path, data):
+    '''
+    Write bytes to path through a temporary file so readers never see a partial file. The file gets
+    eventstore.FILE_MODE, as if written in place.
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, eventstore.FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def is_cached(key):
+    '''
+    :param key: cache key, e.g. 'matches/72/107'
+    :return: True if a copy is on disk, so reading it does not wait for the network
+    '''
+    meta = read_meta(key)
+    return meta is not None and os.path.exists(_data_path(key, meta['sha256']))
+
+
+def read_meta(key):
+    '''
+    :param key: cache key, e.g. 'events/3906390'
+    :return: metadata dict of the cached copy, or None if nothing is cached
+    '''
+    try:
+        with open(_meta_path(key), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store(key, url, raw, response):
+    sha = hashlib.sha256(raw).hexdigest()
+    old = read_meta(key)
+    meta = {'url': url, 'sha256': sha, 'size': len(raw),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'checked': time.time()}
+    if old is None or old['sha256'] != sha or not os.path.exists(_data_path(key, sha)):
+        write_atomic(_data_path(key, sha), gzip.compress(raw, compresslevel=6))
+    write_atomic(_meta_path(key), json.dumps(meta).encode())
+    if old is not None and old['sha256'][:16] != sha[:16]:
+        try:
+            os.unlink(_data_path(key, old['sha256']))
+        except OSError:
+            pass
+    return meta
+
+
+def _download(key, url, meta=None):
+    '''
+    Conditional GET of url against the cached copy (if any), storing whatever changed.
+    :return: metadata of the current version
+    '''
+    headers = {}
+    if meta is not None:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    response = fetch.get(url, headers=headers)
+    if response.status_code == 304 and meta is not None:
+        meta['checked'] = time.time()
+        write_atomic(_meta_path(key), json.dumps(meta).encode())
+        return meta
+    response.raise_for_status()
+
+    new_meta = _store(key, url, response.content, response)
+    if meta is not None and new_meta['sha256'] != meta['sha256'] and key.startswith('events/'):
+        match_events_cache.discard(int(key.split('/')[1]))
+    return new_meta
+
+
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def _revalidate_in_background(key, url, meta):
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def run():
+        try:
+            _download(key, url, meta)
+        except requests.RequestException:
+            logger.warning('Revalidation of %s failed, keeping cached copy', key)
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def ensure_cached(key, url):
+    '''
+    Make sure a copy of url is on disk, downloading only when nothing is cached yet.
+    A cached copy older than MAX_AGE is kept as it is and revalidated in the background.
+    :param key: cache key, e.g. 'events/3906390'
+    :param url: upstream URL of the file
+    :return: metadata of the cached copy
+    '''
+    meta = read_meta(key)
+    if meta is not None and os.path.exists(_data_path(key, meta['sha256'])):
+        if not OFFLINE and time.time() - meta['checked'] >= MAX_AGE:
+            _revalidate_in_background(key, url, meta)
+        return meta
+    if OFFLINE:
+        raise CacheMiss(f'{key} is not cached and offline mode is on')
+    return _download(key, url)
+
+
+def revalidate(key, url):
+    '''
+    Check the cached copy of url against upstream now, downloading it if it changed.
+    In offline mode the cached copy is returned as it is.
+    :return: metadata of the current version
+    '''
+    meta = read_meta(key)
+    if OFFLINE:
+        if meta is None:
+            raise CacheMiss(f'{key} is not cached and offline mode is on')
+        return meta
+    if meta is not None and not os.path.exists(_data_path(key, meta['sha256'])):
+        meta = None
+    return _download(key, url, meta)
+
+
+def open_cached(key, url):
+    '''
+    :return: text stream of the cached copy of url, decompressed on the fly
+    '''
+    for attempt in range(2):
+        meta = ensure_cached(key, url)
+        try:
+            return gzip.open(_data_path(key, meta['sha256']), 'rt', encoding='utf-8')
+        except FileNotFoundError:
+            # Replaced by a concurrent revalidation between the two calls
+            if attempt:
+                raise
+
+
+def fetch_cached(key, url):
+    '''
+    Read-through cache for the raw bytes of url, see ensure_cached.
+    :return: raw (uncompressed) bytes of the file
+    '''
+    with open_cached(key, url) as f:
+        return f.buffer.read()
+
+
+def source_hash(match_id):
+    '''
+    :param match_id: Statsbomb match id
+    :return: sha256 of the cached event file, or None if it is not cached
+    '''
+    meta = read_meta(f'events/{match_id}')
+    return meta['sha256'] if meta else None
+
+
+def load_events(match_id, team=None, fields=FIELDS):
+    '''
+    Stream the event data of a match from the disk cache, keeping only the fields the app reads.
+    :param match_id: Statsbomb match id
+    :param team: optional team name or id to keep
+    :param fields: projection spec, None keeps whole events
+    :return: list of event dicts
+    '''
+    with open_cached(f'events/{match_id}', event_url(match_id)) as f:
+        return list(iter_events(f, team, fields))
+
+
+def get_match_table(match_id):
+    '''
+    Event table of a match, shared through the in-process LRU. Callers must not mutate it.
+    Matches converted into the columnar store are read from there instead of decoding json.
+    :param match_id: Statsbomb match id
+    :return: EventTable
+    '''
+    key, url = f'events/{match_id}', event_url(match_id)
+
+    def load():
+        table = None
+        if eventstore.has_match(match_id):
+            table = EventTable.load(match_id)
+            meta = read_meta(key)
+            if meta is not None:
+                if meta['sha256'] != table.source_sha256:
+                    table = None
+                else:
+                    ensure_cached(key, url)
+        if table is None:
+            meta = ensure_cached(key, url)
+            table = EventTable(eventstore.to_columns(load_events(match_id), meta['sha256'], meta['size']))
+        return table, table.nbytes
+
+    return match_events_cache.get_or_load(int(match_id), load)
+
+
+def load_matches(competition_id, season_id):
+    '''
+    Load the match list of a competition season through the disk cache.
+    :return: list of match dicts
+    '''
+    return json.loads(fetch_cached(f'matches/{competition_id}/{season_id}',
+                                   matches_url(competition_id, season_id)))
+
+
+def load_competitions():
+    '''
+    Load the list of competition seasons published by Statsbomb through the disk cache.
+    :return: list of competition season dicts
+    '''
+    return json.loads(fetch_cached('competitions', competitions_url()))
@@ -0,0 +1,240 @@
+'''
+Columnar per-match event store.
+
+Each Statsbomb event file is converted once into an uncompressed NumPy .npz of typed columns, one row
+per event, so loading a match is a handful of array reads instead of json decoding. Run as a script to
+convert matches:
+
+    python eventstore.py                  # every match of the World Cup 2023
+    python eventstore.py 3906390 3893798  # selected matches
+'''
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+STORE_DIR = os.environ.get('STATSBOMB_STORE_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'store'))
+
+# Mode of written files: mkstemp creates them readable by the owner only, they get what open() would give
+_umask = os.umask(0)
+os.umask(_umask)
+FILE_MODE = 0o644 & ~_umask
+
+# Missing values are -1 in integer columns and NaN in float columns.
+MISSING = -1
+
+# Bumped whenever COLUMNS change; files of another version are converted again
+STORE_VERSION = 2
+
+
+def _get(event, *path):
+    for key in path:
+        if key not in event:
+            return None
+        event = event[key]
+    return event
+
+
+def _end_location(event):
+    return _get(event, 'pass', 'end_location') or _get(event, 'carry', 'end_location')
+
+
+# Column name, dtype and how to read it from a (projected) Statsbomb event
+COLUMNS = [
+    ('index', np.int32, lambda e: e['index']),
+    ('period', np.int8, lambda e: e['period']),
+    ('minute', np.int16, lambda e: e['minute']),
+    ('second', np.int16, lambda e: e['second']),
+    ('type_id', np.int16, lambda e: e['type']['id']),
+    ('team_id', np.int32, lambda e: e['team']['id']),
+    ('possession', np.int16, lambda e: e.get('possession')),
+    ('possession_team_id', np.int32, lambda e: _get(e, 'possession_team', 'id')),
+    ('player_id', np.int32, lambda e: _get(e, 'player', 'id')),
+    ('position_id', np.int8, lambda e: _get(e, 'position', 'id')),
+    ('x', np.float64, lambda e: e['location'][0] if 'location' in e else None),
+    ('y', np.float64, lambda e: e['location'][1] if 'location' in e else None),
+    ('end_x', np.float64, lambda e: (_end_location(e) or (None,))[0]),
+    ('end_y', np.float64, lambda e: (_end_location(e) or (None, None))[1]),
+    ('pass_length', np.float64, lambda e: _get(e, 'pass', 'length')),
+    ('pass_angle', np.float64, lambda e: _get(e, 'pass', 'angle')),
+    ('duration', np.float64, lambda e: e.get('duration')),
+    ('pass_outcome_id', np.int16, lambda e: _get(e, 'pass', 'outcome', 'id')),
+    ('shot_outcome_id', np.int16, lambda e: _get(e, 'shot', 'outcome', 'id')),
+    ('duel_type_id', np.int16, lambda e: _get(e, 'duel', 'type', 'id')),
+    ('duel_outcome_id', np.int16, lambda e: _get(e, 'duel', 'outcome', 'id')),
+    ('interception_outcome_id', np.int16, lambda e: _get(e, 'interception', 'outcome', 'id')),
+]
+
+
+def match_path(match_id, store_dir=None):
+    return os.path.join(store_dir or STORE_DIR, 'events', f'{match_id}.npz')
+
+
+def to_columns(events, source_sha256='', source_size=0):
+    '''
+    :param events: list of (projected) Statsbomb event dicts of one match
+    :param source_sha256: hash of the event file the columns were built from
+    :param source_size: byte size of that file
+    :return: dict of column name to NumPy array
+    '''
+    columns = {}
+    for name, dtype, read in COLUMNS:
+        missing = np.nan if np.issubdtype(dtype, np.floating) else MISSING
+        values = [read(e) for e in events]
+        columns[name] = np.array([missing if v is None else v for v in values], dtype=dtype)
+
+    # Names are dictionary-encoded: a small id -> name table per field
+    teams = {e['team']['id']: e['team']['name'] for e in events}
+    columns['team_ids'] = np.array(list(teams), dtype=np.int32)
+    columns['team_names'] = np.array(list(teams.values()), dtype=str)
+    outcomes = {e['shot']['outcome']['id']: e['shot']['outcome']['name'] for e in events if 'shot' in e}
+    columns['shot_outcome_ids'] = np.array(list(outcomes), dtype=np.int16)
+    columns['shot_outcome_names'] = np.array(list(outcomes.values()), dtype=str)
+
+    # Tactics lineups (Starting XI, Tactical Shift) as a ragged array: the position ids of row
+    # lineup_rows[i] are lineup_position_id[lineup_offsets[i]:lineup_offsets[i+1]]
+    rows = [i for i, e in enumerate(events) if 'tactics' in e]
+    lineups = [[p['position']['id'] for p in events[i]['tactics']['lineup']] for i in rows]
+    columns['lineup_rows'] = np.array(rows, dtype=np.int32)
+    columns['lineup_offsets'] = np.cumsum([0] + [len(l) for l in lineups]).astype(np.int32)
+    columns['lineup_position_id'] = np.array([p for l in lineups for p in l], dtype=np.int8)
+
+    columns['store_version'] = np.array(STORE_VERSION)
+    columns['source_sha256'] = np.array(source_sha256)
+    columns['source_size'] = np.array(source_size, dtype=np.int64)
+    return columns
+
+
+def save_columns(path, columns):
+    '''
+    Write columns to path atomically, uncompressed so they load without inflating.
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **columns)
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def has_match(match_id, store_dir=None):
+    '''
+    :return: True if the match is in the store, converted with the current COLUMNS
+    '''
+    try:
+        with np.load(match_path(match_id, store_dir), allow_pickle=False) as npz:
+            return 'store_version' in npz.files and int(npz['store_version']) == STORE_VERSION
+    except FileNotFoundError:
+        return False
+
+
+def load_columns(path):
+    '''
+    :return: dict of name to NumPy array of an .npz written by save_columns
+    '''
+    with np.load(path, allow_pickle=False) as npz:
+        return {name: npz[name] for name in npz.files}
+
+
+def load_match(match_id, store_dir=None):
+    '''
+    :param match_id: Statsbomb match id
+    :return: dict of column name to NumPy array
+    '''
+    return load_columns(match_path(match_id, store_dir))
+
+
+def to_events(columns, team=None):
+    '''
+    Rebuild projected Statsbomb event dicts from columns, for code that still works on dicts.
+    :param columns: dict returned by load_match
+    :param team: optional team name or id to keep
+    :return: list of event dicts shaped like eventstream.FIELDS
+    '''
+    c = {name: columns[name].tolist() for name, _, _ in COLUMNS}
+    team_names = dict(zip(columns['team_ids'].tolist(), columns['team_names'].tolist()))
+    outcome_names = dict(zip(columns['shot_outcome_ids'].tolist(), columns['shot_outcome_names'].tolist()))
+    offsets = columns['lineup_offsets'].tolist()
+    position_ids = columns['lineup_position_id'].tolist()
+    lineups = {row: position_ids[offsets[i]:offsets[i + 1]]
+               for i, row in enumerate(columns['lineup_rows'].tolist())}
+
+    events = []
+    for i in range(len(c['index'])):
+        team_id = c['team_id'][i]
+        if team is not None and team != team_id and team != team_names[team_id]:
+            continue
+        e = {'index': c['index'][i], 'period': c['period'][i], 'minute': c['minute'][i],
+             'second': c['second'][i], 'type': {'id': c['type_id'][i]},
+             'team': {'id': team_id, 'name': team_names[team_id]}}
+        if c['duration'][i] == c['duration'][i]:
+            e['duration'] = c['duration'][i]
+        if c['x'][i] == c['x'][i]:
+            e['location'] = [c['x'][i], c['y'][i]]
+        if c['possession'][i] != MISSING:
+            e['possession'] = c['possession'][i]
+            e['possession_team'] = {'id': c['possession_team_id'][i]}
+        if c['player_id'][i] != MISSING:
+            e['player'] = {'id': c['player_id'][i]}
+        if c['position_id'][i] != MISSING:
+            e['position'] = {'id': c['position_id'][i]}
+
+        type_id = c['type_id'][i]
+        end = [c['end_x'][i], c['end_y'][i]]
+        if type_id == 30:
+            e['pass'] = {'length': c['pass_length'][i], 'angle': c['pass_angle'][i], 'end_location': end}
+            if c['pass_outcome_id'][i] != MISSING:
+                e['pass']['outcome'] = {'id': c['pass_outcome_id'][i]}
+        elif type_id == 43:
+            e['carry'] = {'end_location': end}
+        elif type_id == 16:
+            outcome_id = c['shot_outcome_id'][i]
+            e['shot'] = {'outcome': {'id': outcome_id, 'name': outcome_names[outcome_id]}}
+        elif type_id == 4:
+            e['duel'] = {'type': {'id': c['duel_type_id'][i]}}
+            if c['duel_outcome_id'][i] != MISSING:
+                e['duel']['outcome'] = {'id': c['duel_outcome_id'][i]}
+        elif type_id == 10:
+            e['interception'] = {'outcome': {'id': c['interception_outcome_id'][i]}}
+        if i in lineups:
+            e['tactics'] = {'lineup': [{'position': {'id': p}} for p in lineups[i]]}
+        events.append(e)
+    return events
+
+
+def convert_match(match_id, store_dir=None):
+    '''
+    Convert the cached (or freshly downloaded) event file of a match into the store.
+    :return: path of the written file
+    '''
+    from eventcache import ensure_cached, event_url, load_events
+
+    meta = ensure_cached(f'events/{match_id}', event_url(match_id))
+    path = match_path(match_id, store_dir)
+    save_columns(path, to_columns(load_events(match_id), meta['sha256'], meta['size']))
+    return path
+
+
+def main(argv=None):
+    from eventcache import load_matches
+
+    parser = argparse.ArgumentParser(description='Convert Statsbomb event files into the columnar store.')
+    parser.add_argument('match_ids', nargs='*', type=int, help='matches to convert (default: whole season)')
+    parser.add_argument('--competition', type=int, default=72)
+    parser.add_argument('--season', type=int, default=107)
+    parser.add_argument('--store-dir', default=None, help=f'output directory (default: {STORE_DIR})')
+    args = parser.parse_args(argv)
+
+    match_ids = args.match_ids or [m['match_id'] for m in load_matches(args.competition, args.season)]
+    for match_id in match_ids:
+        print(convert_match(match_id, args.store_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import json
+
+# Fields of a Statsbomb event the app reads, as a nested projection spec. True keeps a value whole,
+# a dict keeps only the listed keys of a nested object and a one-element list applies its spec to
+# every item of an array. Projected events keep the Statsbomb shape, so e['pass']['length'] still works.
+FIELDS = {
+    'index': True, 'period': True, 'minute': True, 'second': True, 'duration': True,
+    'location': True,
+    'possession': True, 'possession_team': {'id': True},
+    'type': {'id': True},
+    'team': {'id': True, 'name': True},
+    'player': {'id': True},
+    'position': {'id': True},
+    'pass': {'length': True, 'angle': True, 'end_location': True, 'outcome': {'id': True}},
+    'carry': {'end_location': True},
+    'shot': {'outcome': {'id': True, 'name': True}},
+    'duel': {'type': {'id': True}, 'outcome': {'id': True}},
+    'interception': {'outcome': {'id': True}},
+    'tactics': {'lineup': [{'position': {'id': True}}]},
+}
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+
+
+def compile_projection(spec):
+    '''
+    :param spec: projection spec, see FIELDS
+    :return: function reducing a decoded json value to the fields in spec
+    '''
+    if spec is True:
+        return None
+    if isinstance(spec, list):
+        item = compile_projection(spec[0])
+        return (lambda value: list(value)) if item is None else (lambda value: [item(v) for v in value])
+
+    whole = tuple(key for key, sub in spec.items() if sub is True)
+    nested = tuple((key, compile_projection(sub)) for key, sub in spec.items() if sub is not True)
+
+    def projector(value):
+        out = {key: value[key] for key in whole if key in value}
+        for key, sub in nested:
+            if key in value:
+                out[key] = sub(value[key])
+        return out
+
+    return projector
+
+
+def project(value, spec):
+    '''
+    :param value: decoded json value
+    :param spec: projection spec, see FIELDS
+    :return: value reduced to the fields in spec
+    '''
+    projector = compile_projection(spec)
+    return value if projector is None else projector(value)
+
+
+def _matches_team(event, team):
+    return team is None or event['team']['name'] == team or event['team']['id'] == team
+
+
+def iter_raw(stream):
+    '''
+    Decode the elements of a top-level json array one at a time from a text stream, so only a
+    single element is ever materialised.
+    :param stream: text file-like object holding a json array
+    :return: generator of decoded elements
+    '''
+    buffer = stream.read(CHUNK_SIZE)
+    pos = 0
+    eof = not buffer
+
+    def skip(pos):
+        while pos < len(buffer) and buffer[pos] in _whitespace:
+            pos += 1
+        return pos
+
+    pos = skip(pos)
+    if buffer[pos:pos + 1] != '[':
+        raise ValueError('expected a json array')
+    pos += 1
+    expect_value = first = True
+
+    while True:
+        pos = skip(pos)
+        if pos >= len(buffer) and not eof:
+            chunk = stream.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        if pos >= len(buffer):
+            raise ValueError('unterminated json array')
+
+        char = buffer[pos]
+        if char == ']' and (not expect_value or first):
+            return
+        if not expect_value:
+            if char != ',':
+                raise ValueError(f'expected , or ] in json array, got {char!r}')
+            pos += 1
+            expect_value = True
+            continue
+
+        try:
+            value, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = stream.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        # A number may be cut at a chunk boundary and still decode, so make sure it ended
+        if end == len(buffer) and not eof:
+            chunk = stream.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield value
+        pos = end
+        expect_value = first = False
+
+
+def iter_events(stream, team=None, fields=FIELDS):
+    '''
+    :param stream: text file-like object holding a Statsbomb event file
+    :param team: optional team name or id; events of other teams are dropped while parsing
+    :param fields: projection spec, None keeps events whole
+    :return: generator of (projected) event dicts
+    '''
+    projector = None if fields is None else compile_projection(fields)
+    for event in iter_raw(stream):
+        if _matches_team(event, team):
+            yield event if projector is None else projector(event)
@@ -0,0 +1,115 @@
+'''
+Struct-of-arrays representation of the events of a match.
+
+An EventTable holds one NumPy array per field (the columns of eventstore.COLUMNS): integer ids for
+type, team, player, position and outcomes, float coordinates and durations, with team and shot outcome
+names dictionary-encoded. Filters are vectorized boolean masks; event dicts are only built, through
+to_events, for the few rows a figure actually draws.
+'''
+import numpy as np
+
+import eventstore
+from eventstore import COLUMNS
+
+ROW_COLUMNS = [name for name, _, _ in COLUMNS]
+
+
+class EventTable:
+    '''
+    Events of a match (or a subset of them) as NumPy columns.
+    '''
+
+    def __init__(self, columns):
+        '''
+        :param columns: dict of column name to NumPy array, as returned by eventstore.load_match
+        '''
+        self.columns = columns
+
+    @classmethod
+    def from_events(cls, events):
+        '''
+        :param events: list of (projected) Statsbomb event dicts
+        '''
+        return cls(eventstore.to_columns(events))
+
+    @classmethod
+    def load(cls, match_id, store_dir=None):
+        '''
+        :return: EventTable of a match converted into the columnar store
+        '''
+        return cls(eventstore.load_match(match_id, store_dir))
+
+    def __len__(self):
+        return len(self.columns['index'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.columns.values())
+
+    @property
+    def source_sha256(self):
+        return str(self.columns['source_sha256'])
+
+    def team_ids(self):
+        '''
+        :return: dict of team id to team name
+        '''
+        return dict(zip(self.columns['team_ids'].tolist(), self.columns['team_names'].tolist()))
+
+    def type_mask(self, *type_ids):
+        return np.isin(self.columns['type_id'], type_ids)
+
+    def team_mask(self, team):
+        '''
+        :param team: team name or id
+        '''
+        if isinstance(team, str):
+            ids = self.columns['team_ids'][self.columns['team_names'] == team]
+            return np.isin(self.columns['team_id'], ids)
+        return self.columns['team_id'] == team
+
+    def position_mask(self, position_ids):
+        return np.isin(self.columns['position_id'], position_ids)
+
+    def located_mask(self):
+        return ~np.isnan(self.columns['x'])
+
+    def shot_outcome_mask(self, name):
+        '''
+        :param name: shot outcome name, e.g. 'Goal'
+        '''
+        ids = self.columns['shot_outcome_ids'][self.columns['shot_outcome_names'] == name]
+        return np.isin(self.columns['shot_outcome_id'], ids)
+
+    def take(self, mask):
+        '''
+        :param mask: boolean mask or row indices
+        :return: EventTable of the selected rows, in match order
+        '''
+        rows = np.flatnonzero(mask) if np.asarray(mask).dtype == bool else np.asarray(mask)
+        columns = dict(self.columns)
+        for name in ROW_COLUMNS:
+            columns[name] = self.columns[name][rows]
+
+        # Keep the lineups of selected rows, renumbered to their new row positions
+        lineup_rows = self.columns['lineup_rows']
+        offsets = self.columns['lineup_offsets']
+        lengths = np.diff(offsets)
+        keep = np.isin(lineup_rows, rows)
+        columns['lineup_rows'] = np.searchsorted(rows, lineup_rows[keep]).astype(np.int32)
+        columns['lineup_offsets'] = np.concatenate([[0], np.cumsum(lengths[keep])]).astype(np.int32)
+        columns['lineup_position_id'] = self.columns['lineup_position_id'][np.repeat(keep, lengths)]
+        return EventTable(columns)
+
+    def to_events(self, mask=None):
+        '''
+        Adapter for code working on event dicts.
+        :param mask: optional boolean mask or row indices; all rows if None
+        :return: list of event dicts shaped like eventstream.FIELDS
+        '''
+        table = self if mask is None else self.take(mask)
+        return eventstore.to_events(table.columns)
+
@@ -0,0 +1,82 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Connect/read timeouts in seconds, so a slow upstream can never hold a worker indefinitely.
+CONNECT_TIMEOUT = float(os.environ.get('STATSBOMB_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.environ.get('STATSBOMB_READ_TIMEOUT', 20))
+
+# Retry budget: at most RETRIES extra attempts, with full-jitter exponential backoff between them,
+# and never more than RETRY_DEADLINE seconds spent on one call.
+RETRIES = int(os.environ.get('STATSBOMB_RETRIES', 3))
+BACKOFF = 0.5
+BACKOFF_MAX = 8
+RETRY_DEADLINE = float(os.environ.get('STATSBOMB_RETRY_DEADLINE', 45))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Keep-alive connections kept per host.
+POOL_SIZE = int(os.environ.get('STATSBOMB_POOL_SIZE', 16))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def session():
+    '''
+    :return: the process-wide requests.Session, created on first use (and again after a fork)
+    '''
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            s.mount('https://', adapter)
+            s.mount('http://', adapter)
+            _session, _session_pid = s, os.getpid()
+        return _session
+
+
+def _backoff(attempt, response=None):
+    '''
+    :return: seconds to sleep before the next attempt
+    '''
+    if response is not None and response.headers.get('Retry-After', '').isdigit():
+        return min(BACKOFF_MAX, float(response.headers['Retry-After']))
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF * 2 ** attempt))
+
+
+def get(url, headers=None):
+    '''
+    GET url through the pooled session, retrying connection errors, timeouts and retryable statuses.
+    :param url: URL to fetch
+    :param headers: optional request headers
+    :return: requests.Response of the last attempt
+    :raises requests.RequestException: when every attempt failed to connect or timed out
+    '''
+    deadline = time.monotonic() + RETRY_DEADLINE
+    for attempt in range(RETRIES + 1):
+        response = None
+        try:
+            response = session().get(url, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+            if response.status_code not in RETRY_STATUS:
+                return response
+            error = None
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+
+        delay = _backoff(attempt, response)
+        if attempt == RETRIES or time.monotonic() + delay > deadline:
+            if error is not None:
+                raise error
+            return response
+        logger.info('Retrying %s in %.2fs (attempt %d)', url, delay, attempt + 1)
+        time.sleep(delay)
+
@@ -0,0 +1,191 @@
+'''
+Cache of serialized figures.
+
+For one version of the upstream data a figure is fully determined by the figure, the match and the team.
+Figures are kept as their serialized JSON under a key made of:
+
+- the figure: its name and arguments, the match and the team;
+- the data version: the sha256 of the match's event file, and the baselines version for position
+  matrix figures;
+- CODE_VERSION: a hash of the modules that build figures and of the Plotly version.
+
+A new event file, rebuilt baselines or changed plotting code therefore miss the cache instead of serving
+stale figures.
+
+There are two tiers:
+- an in-process LRU of JSON bytes, bounded by STATSBOMB_FIGURE_CACHE_MB (default 64);
+- gzip files in STORE_DIR/figures, bounded by STATSBOMB_FIGURE_DISK_MB (default 512; 0 turns the disk
+  tier off). Files are evicted oldest first, and a read counts as a use.
+
+A hit is returned decoded from its JSON: no figure is built, validated or converted from NumPy.
+'''
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import plotly
+from plotly.io.json import to_json_plotly
+
+import eventstore
+from eventcache import ensure_cached, event_url, write_atomic
+from figurepool import build_figures
+from lrucache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Modules whose code determines what a figure looks like
+CODE_MODULES = ['tacticplot', 'positionplot', 'soccerfield', 'soccerfield2', 'soccerfield3', 'bundle', 'possession',
+                'eventtable', 'eventstore', 'baselines']
+
+
+def code_version():
+    '''
+    :return: sha256 of the figure building modules and the Plotly version
+    '''
+    h = hashlib.sha256(plotly.__version__.encode())
+    for name in CODE_MODULES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{name}.py'), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+CODE_VERSION = code_version()
+
+
+def data_version(match_id):
+    '''
+    :return: sha256 of the event file of a match, fetched into the disk cache if it is not there yet
+    '''
+    return ensure_cached(f'events/{match_id}', event_url(match_id))['sha256']
+
+
+class FigureCache:
+    '''
+    Serialized figures in memory over gzip files on disk, see the module docstring.
+    '''
+
+    def __init__(self, max_bytes, directory=None, max_disk_bytes=0):
+        '''
+        :param max_bytes: budget of the in-process tier
+        :param directory: directory of the disk tier, defaults to STORE_DIR/figures
+        :param max_disk_bytes: budget of the disk tier, 0 for no disk tier
+        '''
+        self.memory = LRUCache(max_bytes)
+        self.directory = directory or os.path.join(eventstore.STORE_DIR, 'figures')
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+
+    def key(self, *parts):
+        '''
+        :param parts: figure name and arguments, match, team and data versions
+        :return: key of the figure under the current CODE_VERSION
+        '''
+        return hashlib.sha256(json.dumps([CODE_VERSION, *parts], default=str).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json.gz')
+
+    def get(self, key):
+        '''
+        :return: JSON bytes of the figure, None on a miss
+        '''
+        data = self.memory.get(key)
+        if data is not None or not self.max_disk_bytes:
+            return data
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except (OSError, EOFError):
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self.memory.put(key, data, len(data))
+        return data
+
+    def put(self, key, data):
+        '''
+        :param data: JSON bytes of the figure
+        '''
+        self.memory.put(key, data, len(data))
+        if not self.max_disk_bytes:
+            return
+        compressed = gzip.compress(data, compresslevel=6)
+        path = self._path(key)
+        write_atomic(path, compressed)
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, _, size in self._files())
+            else:
+                self._disk_bytes += len(compressed)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune()
+
+    def _files(self):
+        '''
+        :return: list of (mtime, path, size) of the figure files. The temporary files of writes in
+                 progress are left out, and files removed while listing are skipped
+        '''
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json.gz'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, entry.path, stat.st_size))
+        return files
+
+    def _prune(self):
+        '''
+        Delete the least recently used files until the disk tier is back to 90% of its budget.
+        '''
+        files = sorted(self._files())
+        total = sum(size for _, _, size in files)
+        for _, path, size in files:
+            if total <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.warning('Could not evict %s', path)
+                continue
+            total -= size
+        self._disk_bytes = total
+
+    def figures(self, keys, builds, processes=False):
+        '''
+        :param keys: cache key of every figure
+        :param builds: callable returning the figurepool builds of all figures in the order of keys; only
+                       called if some figure is missing
+        :param processes: the builds make Plotly objects, see figurepool.build_figures
+        :return: list of figures, decoded from the cache or freshly built
+        '''
+        cached = [self.get(key) for key in keys]
+        figures = [None if data is None else json.loads(data) for data in cached]
+        missing = [i for i, data in enumerate(cached) if data is None]
+        if missing:
+            all_builds = builds()
+            for i, figure in zip(missing, build_figures([all_builds[i] for i in missing], processes)):
+                self.put(keys[i], to_json_plotly(figure).encode())
+                figures[i] = figure
+        return figures
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats['disk_hits'] = self.disk_hits
+        stats['disk_bytes'] = self._disk_bytes
+        return stats
+
+
+figure_cache = FigureCache(int(float(os.environ.get('STATSBOMB_FIGURE_CACHE_MB', 64)) * 2**20),
+                           max_disk_bytes=int(float(os.environ.get('STATSBOMB_FIGURE_DISK_MB', 512)) * 2**20))
@@ -0,0 +1,68 @@
+'''
+Concurrent building of the independent figures of one view.
+
+The position matrix builds 30 figures and update_plot builds 4, each one independent of the others.
+build_figures fans such builds out over a worker pool and returns the figures in the order they were
+requested, so the layout is unchanged:
+
+- Dict-based builds (the position matrix, see positionplot) run on a thread pool shared by all requests.
+  It has STATSBOMB_FIGURE_THREADS threads (default: the number of CPUs). 1 builds in the request thread.
+- Plotly-object builds (tactic plots and formations) spend their time in go.Figure property validation,
+  which holds the GIL. They run on a process pool of STATSBOMB_FIGURE_PROCESSES processes (default 0:
+  in the request thread). Figures built in a process come back as plain figure dicts.
+
+Both pools are created on first use. Worker processes are started with spawn, not fork, as the server
+process has threads of its own.
+'''
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+FIGURE_THREADS = int(os.environ.get('STATSBOMB_FIGURE_THREADS', os.cpu_count() or 1))
+FIGURE_PROCESSES = int(os.environ.get('STATSBOMB_FIGURE_PROCESSES', 0))
+
+_lock = threading.Lock()
+_threads = None
+_processes = None
+
+
+def _thread_pool():
+    global _threads
+    with _lock:
+        if _threads is None:
+            _threads = ThreadPoolExecutor(max_workers=FIGURE_THREADS, thread_name_prefix='figures')
+        return _threads
+
+
+def _process_pool():
+    global _processes
+    with _lock:
+        if _processes is None:
+            _processes = ProcessPoolExecutor(max_workers=FIGURE_PROCESSES,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return _processes
+
+
+def _build_json(function, args, kwargs):
+    '''
+    Runs in a worker process: go.Figure does not survive pickling without being validated again, so the
+    figure is sent back as its plain dict.
+    '''
+    figure = function(*args, **kwargs)
+    return figure if isinstance(figure, dict) else figure.to_plotly_json()
+
+
+def build_figures(builds, processes=False):
+    '''
+    :param builds: list of (function, args, kwargs), each building one figure
+    :param processes: the builds make Plotly objects and may run on the process pool
+    :return: list of figures in the order of builds
+    '''
+    if processes and FIGURE_PROCESSES > 0:
+        futures = [_process_pool().submit(_build_json, function, args, kwargs) for function, args, kwargs in builds]
+    elif not processes and FIGURE_THREADS > 1:
+        futures = [_thread_pool().submit(function, *args, **kwargs) for function, args, kwargs in builds]
+    else:
+        return [function(*args, **kwargs) for function, args, kwargs in builds]
+    return [future.result() for future in futures]
@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    '''
+    Thread-safe least-recently-used cache bounded by the total byte size of its entries.
+
+    Concurrent misses on the same key are coalesced: one thread runs the loader while the
+    others wait for its result, so a value is never built twice at the same time.
+    '''
+
+    def __init__(self, max_bytes):
+        '''
+        :param max_bytes: byte budget; least recently used entries are evicted above it
+        '''
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, nbytes):
+        '''
+        :param nbytes: size accounted for this entry
+        '''
+        with self._lock:
+            self._put(key, value, nbytes)
+
+    def _put(self, key, value, nbytes):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (value, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def has_room(self, nbytes):
+        '''
+        :return: True if an entry of nbytes fits without evicting anything
+        '''
+        with self._lock:
+            return self._bytes + nbytes <= self.max_bytes
+
+    def get_or_load(self, key, loader):
+        '''
+        :param key: cache key
+        :param loader: callable returning (value, nbytes), called on a miss
+        :return: cached or freshly loaded value
+        '''
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            pending = self._loading.get(key)
+            if pending is None:
+                pending = self._loading[key] = _Pending()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            return pending.wait()
+
+        try:
+            value, nbytes = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            pending.set_error(e)
+            raise
+        with self._lock:
+            self._put(key, value, nbytes)
+            del self._loading[key]
+        pending.set_value(value)
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        '''
+        :return: dict of counters and current usage
+        '''
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+class _Pending:
+    '''
+    Result slot shared by threads waiting on the same in-flight load.
+    '''
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def set_value(self, value):
+        self._value = value
+        self._done.set()
+
+    def set_error(self, error):
+        self._error = error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
@@ -1,13 +1,12 @@
-import requests
-import json
+import functools
+
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 import soccerfield3
-
-def load_json(url):
-    response = requests.get(url)
-    return response.json()
+from baselines import box_summary, histogram
+from eventtable import EventTable
 
 position_id_dict = {'centerback':[3,4,5],
                     'fullback':[2,6,7,8],
@@ -23,39 +22,217 @@ color_dict = {'centerback':'dodgerblue',
 
 action_dict = {'ball receipt': [42], 'defence':[4,9,10], 'carry': [43], 'pass': [30], 'shot': [16]}
 
+class Selection:
+    '''
+    Events of one team in one match grouped by position group and action as boolean masks over an
+    EventTable, built once and shared by all figures of the position matrix. Every plot_* function
+    takes a Selection, an EventTable or a plain event list.
+    '''
+
+    def __init__(self, events, position_masks=None, action_masks=None):
+        '''
+        :param events: EventTable or event dicts of one team
+        :param position_masks: precomputed dict of position group to mask, e.g. from a match bundle
+        :param action_masks: precomputed dict of action to mask
+        '''
+        self.table = events if isinstance(events, EventTable) else EventTable.from_events(events)
+        self.position_masks = position_masks or {position: self.table.position_mask(ids)
+                                                 for position, ids in position_id_dict.items()}
+        self.action_masks = action_masks or {action: self.table.type_mask(*ids) for action, ids in action_dict.items()}
+        self.located = self.table.located_mask()
+
+    def mask(self, position, action=None, located=False):
+        '''
+        :param position: position group, a key of position_id_dict
+        :param action: action, a key of action_dict; None selects every action
+        :param located: keep only events with a location
+        :return: boolean mask over the table
+        '''
+        mask = self.position_masks[position]
+        if action is not None:
+            mask = mask & self.action_masks[action]
+        if located:
+            mask = mask & self.located
+        return mask
+
+    def values(self, column, position, action=None, located=False):
+        '''
+        :param column: EventTable column, e.g. 'x' or 'pass_length'
+        :return: float array of the column for the selected events, in match order
+        '''
+        return self.table[column][self.mask(position, action, located)]
+
+def selection(events):
+    '''
+    :return: events as a Selection, building one if given an EventTable or a plain event list
+    '''
+    return events if isinstance(events, Selection) else Selection(events)
+
+@functools.lru_cache(maxsize=None)
+def _template():
+    '''
+    :return: the default Plotly template as a plain dict, which go.Figure adds to every figure
+    '''
+    return go.Figure().to_plotly_json()['layout']['template']
+
+@functools.lru_cache(maxsize=None)
+def _subplots_layout():
+    '''
+    :return: axes of the histogram over box plot figures as make_subplots lays them out
+    '''
+    layout = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3]).to_plotly_json()['layout']
+    return {name: value for name, value in layout.items() if name != 'template'}
+
+# Figures of the position matrix are plain dicts with the same JSON as the go.Figure they replace, built
+# without Plotly's property validation. The template and pitch shapes are shared between figures, so
+# figures must not be changed in place; go.Figure(figure) gives a copy that can be.
+
+def _bars(counts, start, size, name, color):
+    '''
+    :return: bar trace drawing bin counts as percentages, like a histogram with histnorm='percent'
+    '''
+    total = counts.sum()
+    bins = np.flatnonzero(counts)
+    return dict(type='bar', x=np.round(start + (bins + 0.5) * size, 10),
+                y=np.round(counts[bins] * 100 / total, 4) if total else [],
+                width=size, name=name, marker=dict(color=color))
+
+def baseline_bars(name, position, axis, registry):
+    '''
+    :param registry: BaselineRegistry of the season, see competitions.Season
+    :return: histogram of the all matches baseline, from its pre-binned counts
+    '''
+    counts, bins = registry.histogram(name, position, axis)
+    return _bars(np.asarray(counts, dtype=np.float64), bins['start'], bins['size'], 'all matches', 'grey')
+
+def selected_bars(values, name, position, axis, registry, size=None):
+    '''
+    :param values: values of the selected match
+    :param size: bin size, defaults to the baseline's; bins share the baseline's edges
+    :return: histogram of the selected match, binned server-side
+    '''
+    counts, bins = registry.histogram(name, position, axis)
+    size = size or bins['size']
+    values = np.asarray(values, dtype=np.float64)
+    start = bins['start']
+    end = start + len(counts) * bins['size']
+    if len(values):
+        start = min(start, np.floor(values.min() / size) * size)
+        end = max(end, values.max())
+    count = int(np.floor((end - start) / size + 1e-9)) + 1
+    return _bars(histogram(values, start, size, count), start, size, 'selected match', color_dict[position])
+
+def _box(summary, name, color):
+    if summary is None:
+        return dict(type='box', x=[], name=name, marker=dict(color=color), showlegend=False, hoverinfo='none')
+    return dict(type='box', q1=[summary['q1']], median=[summary['median']], q3=[summary['q3']],
+                lowerfence=[summary['lowerfence']], upperfence=[summary['upperfence']],
+                y=[name], name=name, orientation='h',
+                marker=dict(color=color), showlegend=False, hoverinfo='none')
+
+def baseline_box(name, position, axis, registry):
+    '''
+    :return: box plot of the all matches baseline, from its precomputed summary
+    '''
+    return _box(registry.summary(name, position, axis), 'all matches', 'grey')
+
+def selected_box(values, position):
+    '''
+    :return: box plot of the selected match, summarized server-side
+    '''
+    return _box(box_summary(values), 'selected match', color_dict[position])
+
+def _distribution(title, values, name, position, axis, registry, max=None, size=None):
+    '''
+    Histogram of the selected match over the all matches baseline, above box plots of both.
+    :param title: figure title
+    :param values: values of the selected match
+    :param name: baseline name, e.g. 'receipt'
+    :param axis: baseline axis
+    :param registry: BaselineRegistry of the season the baseline is read from
+    :param max: end of the x axes, which are ticked every 40 yards; automatic range if None
+    :param size: bin size of the selected match, defaults to the baseline's
+    :return: figure dict
+    '''
+    layout = {axis_name: dict(value) for axis_name, value in _subplots_layout().items()}
+    if max is not None:
+        for axis_name in ('xaxis', 'xaxis2'):
+            layout[axis_name].update(range=[0, max], tickvals=list(range(0, max+1, 40)))
+    layout['yaxis2']['showticklabels'] = False
+    layout.update(margin=dict(l=0, r=0, t=0, b=45), height = 260,
+                  title = dict(text=f'<b>{title}<b>', xanchor="center", x=0.5, y=0.05),
+                  legend=dict(orientation='h', x=0, y=1.15),
+                  dragmode=False, barmode='overlay', template=_template())
+
+    data = [dict(baseline_bars(name, position, axis, registry), xaxis='x', yaxis='y'),
+            dict(selected_bars(values, name, position, axis, registry, size=size), xaxis='x', yaxis='y'),
+            dict(baseline_box(name, position, axis, registry), xaxis='x2', yaxis='y2'),
+            dict(selected_box(values, position), xaxis='x2', yaxis='y2')]
+    for trace in data:
+        trace['opacity'] = 0.45
+    return dict(data=data, layout=layout)
+
+# Grid of the action heatmaps: bin size over the 120 x 80 pitch, and the standard deviation of the Gaussian
+# smoothing of the bin counts (0 for none), both in yards
+CONTOUR_BIN = 4
+CONTOUR_SMOOTHING = 4
+
+@functools.lru_cache(maxsize=None)
+def _smoothing_kernel(n, size, sigma):
+    '''
+    :return: n x n matrix spreading the count of every bin over the bins around it, each column summing to 1
+             so events near the lines are not lost
+    '''
+    centers = np.arange(n) * size
+    kernel = np.exp(-0.5 * ((centers[:, None] - centers[None, :]) / sigma) ** 2)
+    return kernel / kernel.sum(axis=0)
+
+def density(x, y, size=CONTOUR_BIN, smoothing=CONTOUR_SMOOTHING):
+    '''
+    Event counts on a fixed grid over the pitch, optionally smoothed.
+    :param x: x of the events
+    :param y: y of the events
+    :param size: bin size in yards
+    :param smoothing: standard deviation of the Gaussian smoothing in yards, 0 for raw counts
+    :return: (bin centers along x, bin centers along y, counts indexed [y][x])
+    '''
+    nx, ny = int(np.ceil(120 / size)), int(np.ceil(80 / size))
+    counts, _, _ = np.histogram2d(x, y, bins=[nx, ny], range=[[0, nx * size], [0, ny * size]])
+    z = counts.T
+    if smoothing:
+        z = _smoothing_kernel(ny, size, smoothing) @ z @ _smoothing_kernel(nx, size, smoothing).T
+    return (np.arange(nx) + 0.5) * size, (np.arange(ny) + 0.5) * size, np.round(z, 2)
+
 def plot_contour(events, position):
-    positin_events = [e for e in events if 'position' in e and 'location' in e
-                      and e['position']['id'] in position_id_dict[position]]
+    selected = selection(events)
     field_layout = soccerfield3.get_layout()
-    fig = go.Figure(layout=field_layout)
-    fig.update_layout(xaxis=dict(showgrid=False, zeroline=False), yaxis=dict(showgrid=False, zeroline=False),
-                      plot_bgcolor='rgba(0, 0, 0, 0)', paper_bgcolor='rgba(0, 0, 0, 0)',
-                      margin=dict(l=0, r=10, t=0, b=45), height = 260,
-                      title = dict(text=f'<b>{position} action heatmap<b>',
-                                 xanchor="center", x=0.5, y=0.05))
-    fig.update_layout(dragmode=False)
-
-    contour= go.Figure(go.Histogram2dContour(
-        x=[e['location'][0] for e in positin_events],
-        y=[e['location'][1] for e in positin_events],
-        colorscale=['white', color_dict[position]], opacity=0.8, ncontours=10,
+    layout = dict(field_layout,
+                  xaxis=dict(field_layout['xaxis'], showgrid=False, zeroline=False),
+                  yaxis=dict(field_layout['yaxis'], showgrid=False, zeroline=False),
+                  plot_bgcolor='rgba(0, 0, 0, 0)', paper_bgcolor='rgba(0, 0, 0, 0)',
+                  margin=dict(l=0, r=10, t=0, b=45), height = 260,
+                  title = dict(text=f'<b>{position} action heatmap<b>',
+                               xanchor="center", x=0.5, y=0.05),
+                  dragmode=False, template=_template())
+
+    # Without events the pitch stays empty: a flat density would fill it with one colour
+    x = selected.values('x', position, located=True)
+    if not len(x):
+        return dict(data=[], layout=layout)
+
+    # Binned and smoothed here, so the figure holds the same small grid however many events there are
+    x, y, z = density(x, selected.values('y', position, located=True))
+    contour = dict(
+        type='contour', x=x, y=y, z=z,
+        colorscale=[[0.0, 'white'], [1.0, color_dict[position]]], opacity=0.8, ncontours=10,
         contours=dict(
             showlines=False,
             coloring='fill', showlabels=True
         ),
-        showscale = False),
-
-    )
-    fig.add_traces(contour.data)
-    return fig
-
-with open('json/all_receipt.json', "r") as json_file:
-    all_receipt = json.load(json_file)
-def plot_ballreceipt(events, position, ax):
-    all = all_receipt[position]
-    selected = [e for e in events if 'position' in e and 'location' in e
-                                     and e['type']['id'] == 42
-                                     and e['position']['id'] in position_id_dict[position]]
+        showscale = False)
+    return dict(data=[contour], layout=layout)
+
+def plot_ballreceipt(events, position, ax, registry):
     if ax == 0:
         max = 120
         ax_name = 'depth'
@@ -63,48 +240,10 @@ def plot_ballreceipt(events, position, ax):
         max = 80
         ax_name = 'width'
 
-    fig = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3])
-    fig.update_layout(margin=dict(l=0, r=0, t=0, b=45), height = 260,
-                      title = dict(text=f'<b>{position} ball receipt {ax_name}<b>',
-                                 xanchor="center", x=0.5, y=0.05),
-                      legend=dict(orientation='h', x=0, y=1.15),
-                      )
-    fig.update_layout(dragmode=False)
-
-    fig.add_trace(go.Histogram(
-        x=[e[ax] for e in all],
-        histnorm='percent', xbins=go.histogram.XBins(size=1),
-        name='all matches', marker=dict(color='grey')),
-        row=1, col=1)
-    fig.add_trace(go.Histogram(
-        x=[e['location'][ax] for e in selected],
-        histnorm='percent', xbins=go.histogram.XBins(size=1),
-        name='selected match', marker=dict(color=color_dict[position])),
-        row=1, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e[ax] for e in all], marker=dict(color='grey'),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e['location'][ax] for e in selected], marker=dict(color=color_dict[position]),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.update_xaxes(range=[0, max], row=1, col=1, tickvals=list(range(0, max+1, 40)))
-    fig.update_xaxes(range=[0, max], row=2, col=1, tickvals=list(range(0, max+1, 40)))
-    fig.update_yaxes(showticklabels=False, row=2, col=1)
-
-    fig.update_layout(barmode='overlay')
-    fig.update_traces(opacity=0.45)
-    return fig
-
-with open('json/all_defence.json', "r") as json_file:
-    all_defence = json.load(json_file)
-def plot_defence(events, position, ax):
-    all = all_defence[position]
-    selected = [e for e in events if 'position' in e and 'location' in e
-                                     and e['type']['id'] in [4,9,10]
-                                     and e['position']['id'] in position_id_dict[position]]
+    values = selection(events).values('xy'[ax], position, 'ball receipt', located=True)
+    return _distribution(f'{position} ball receipt {ax_name}', values, 'receipt', position, ax, registry, max=max)
+
+def plot_defence(events, position, ax, registry):
     if ax == 0:
         max = 120
         ax_name = 'depth'
@@ -112,128 +251,18 @@ def plot_defence(events, position, ax):
         max = 80
         ax_name = 'width'
 
-    fig = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3])
-    fig.update_layout(margin=dict(l=0, r=0, t=0, b=45), height = 260,
-                      title = dict(text=f'<b>{position} defence {ax_name}<b>',
-                                 xanchor="center", x=0.5, y=0.05),
-                      legend=dict(orientation='h', x=0, y=1.15),
-                      )
-    fig.update_layout(dragmode=False)
-
-    fig.add_trace(go.Histogram(
-        x=[e[ax] for e in all],
-        histnorm='percent', xbins=go.histogram.XBins(size=1),
-        name='all matches', marker=dict(color='grey')),
-        row=1, col=1)
-    fig.add_trace(go.Histogram(
-        x=[e['location'][ax] for e in selected],
-        histnorm='percent', xbins=go.histogram.XBins(size=1),
-        name='selected match', marker=dict(color=color_dict[position])),
-        row=1, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e[ax] for e in all], marker=dict(color='grey'),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e['location'][ax] for e in selected], marker=dict(color=color_dict[position]),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.update_xaxes(range=[0, max], row=1, col=1, tickvals=list(range(0, max+1, 40)))
-    fig.update_xaxes(range=[0, max], row=2, col=1, tickvals=list(range(0, max+1, 40)))
-    fig.update_yaxes(showticklabels=False, row=2, col=1)
-
-    fig.update_layout(barmode='overlay')
-    fig.update_traces(opacity=0.45)
-    return fig
-
-with open('json/all_pass.json', "r") as json_file:
-    all_pass = json.load(json_file)
-def plot_passlength(events, position):
-    all = [e for e in all_pass[position]]
-    selected = [e for e in events if 'position' in e
-                                     and e['position']['id'] in position_id_dict[position]
-                                     and e['type']['id'] == 30]
-
-    fig = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3])
-    fig.update_layout(margin=dict(l=0, r=0, t=0, b=45), height = 260,
-                      title = dict(text=f'<b>{position} passing length<b>',
-                                 xanchor="center", x=0.5, y=0.05),
-                      legend=dict(orientation='h', x=0, y=1.15),
-                      )
-    fig.update_layout(dragmode=False)
-
-    fig.add_trace(go.Histogram(
-        x=[p['length'] for p in all],
-        histnorm='percent', xbins=go.histogram.XBins(size=1),
-        name='all matches', marker=dict(color='grey')),
-        row=1, col=1)
-    fig.add_trace(go.Histogram(
-        x=[e['pass']['length'] for e in selected],
-        histnorm='percent', xbins=go.histogram.XBins(size=1),
-        name='selected match', marker=dict(color=color_dict[position])),
-        row=1, col=1)
-
-    fig.add_trace(go.Box(
-        x=[p['length'] for p in all], marker=dict(color='grey'),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e['pass']['length'] for e in selected], marker=dict(color=color_dict[position]),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.update_yaxes(showticklabels=False, row=2, col=1)
-
-    fig.update_layout(barmode='overlay')
-    fig.update_traces(opacity=0.45)
-    return fig
-
-def plot_passangle(events, position):
-    all = [e for e in all_pass[position]]
-    selected = [e for e in events if 'position' in e
-                                     and e['position']['id'] in position_id_dict[position]
-                                     and e['type']['id'] == 30]
-
-    fig = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3])
-    fig.update_layout(margin=dict(l=0, r=0, t=0, b=45), height = 260,
-                      title = dict(text=f'<b>{position} passing angle<b>',
-                                 xanchor="center", x=0.5, y=0.05),
-                      legend=dict(orientation='h', x=0, y=1.15),
-                      )
-    fig.update_layout(dragmode=False)
-
-    fig.add_trace(go.Histogram(
-        x=[p['angle'] for p in all],
-        histnorm='percent', xbins=go.histogram.XBins(size=0.1),
-        name='all matches', marker=dict(color='grey')),
-        row=1, col=1)
-    fig.add_trace(go.Histogram(
-        x=[e['pass']['angle'] for e in selected],
-        histnorm='percent', xbins=go.histogram.XBins(size=0.1),
-        name='selected match', marker=dict(color=color_dict[position])),
-        row=1, col=1)
-
-    fig.add_trace(go.Box(
-        x=[p['angle'] for p in all], marker=dict(color='grey'),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e['pass']['angle'] for e in selected], marker=dict(color=color_dict[position]),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.update_yaxes(showticklabels=False, row=2, col=1)
-
-    fig.update_layout(barmode='overlay')
-    fig.update_traces(opacity=0.45)
-    return fig
-
-with open('json/all_shot.json', "r") as json_file:
-    all_shot = json.load(json_file)
-def plot_shot(events, position, ax):
-    all = [e for e in all_shot[position]]
-    selected = [e for e in events if 'position' in e and 'location' in e
-                                     and e['type']['id'] == 16
-                                     and e['position']['id'] in position_id_dict[position]]
+    values = selection(events).values('xy'[ax], position, 'defence', located=True)
+    return _distribution(f'{position} defence {ax_name}', values, 'defence', position, ax, registry, max=max)
+
+def plot_passlength(events, position, registry):
+    values = selection(events).values('pass_length', position, 'pass')
+    return _distribution(f'{position} passing length', values, 'pass', position, 'length', registry)
+
+def plot_passangle(events, position, registry):
+    values = selection(events).values('pass_angle', position, 'pass')
+    return _distribution(f'{position} passing angle', values, 'pass', position, 'angle', registry)
+
+def plot_shot(events, position, ax, registry):
     if ax == 0:
         max = 120
         ax_name = 'depth'
@@ -241,78 +270,9 @@ def plot_shot(events, position, ax):
         max = 80
         ax_name = 'width'
 
-    fig = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3])
-    fig.update_layout(margin=dict(l=0, r=0, t=0, b=45), height = 260,
-                      title = dict(text=f'<b>{position} shot {ax_name}<b>',
-                                 xanchor="center", x=0.5, y=0.05),
-                      legend=dict(orientation='h', x=0, y=1.15),
-                      )
-    fig.update_layout(dragmode=False)
-
-    fig.add_trace(go.Histogram(
-        x=[e[ax] for e in all],
-        histnorm='percent', xbins=go.histogram.XBins(size=1),
-        name='all matches', marker=dict(color='grey')),
-        row=1, col=1)
-    fig.add_trace(go.Histogram(
-        x=[e['location'][ax] for e in selected],
-        histnorm='percent', xbins=go.histogram.XBins(size=0.5),
-        name='selected match', marker=dict(color=color_dict[position])),
-        row=1, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e[ax] for e in all], marker=dict(color='grey'),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e['location'][ax] for e in selected], marker=dict(color=color_dict[position]),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.update_xaxes(range=[0, max], row=1, col=1, tickvals=list(range(0, max+1, 40)))
-    fig.update_xaxes(range=[0, max], row=2, col=1, tickvals=list(range(0, max+1, 40)))
-    fig.update_yaxes(showticklabels=False, row=2, col=1)
-
-    fig.update_layout(barmode='overlay')
-    fig.update_traces(opacity=0.45)
-    return fig
-
-with open('json/all_carry.json', "r") as json_file:
-    all_carry = json.load(json_file)
-def plot_carry(events, position):
-    all = all_carry[position]
-    selected = [e for e in events if 'position' in e
-                                     and e['position']['id'] in position_id_dict[position]
-                                     and e['type']['id'] == 43]
-
-    fig = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3])
-    fig.update_layout(margin=dict(l=0, r=0, t=0, b=45), height = 260,
-                      title = dict(text=f'<b>{position} carry duration(s)<b>',
-                                 xanchor="center", x=0.5, y=0.05),
-                      legend=dict(orientation='h', x=0, y=1.15),
-                      )
-    fig.update_layout(dragmode=False)
-
-    fig.add_trace(go.Histogram(
-        x=all,
-        histnorm='percent', xbins=go.histogram.XBins(size=0.1),
-        name='all matches', marker=dict(color='grey')),
-        row=1, col=1)
-    fig.add_trace(go.Histogram(
-        x=[e['duration'] for e in selected],
-        histnorm='percent', xbins=go.histogram.XBins(size=0.1),
-        name='selected match', marker=dict(color=color_dict[position])),
-        row=1, col=1)
-
-    fig.add_trace(go.Box(
-        x=all, marker=dict(color='grey'),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.add_trace(go.Box(
-        x=[e['duration'] for e in selected], marker=dict(color=color_dict[position]),
-        showlegend=False, hoverinfo='none'), row=2, col=1)
-
-    fig.update_yaxes(showticklabels=False, row=2, col=1)
-
-    fig.update_layout(barmode='overlay')
-    fig.update_traces(opacity=0.45)
-    return fig
\ No newline at end of file
+    values = selection(events).values('xy'[ax], position, 'shot', located=True)
+    return _distribution(f'{position} shot {ax_name}', values, 'shot', position, ax, registry, max=max, size=0.5)
+
+def plot_carry(events, position, registry):
+    values = selection(events).values('duration', position, 'carry')
+    return _distribution(f'{position} carry duration(s)', values, 'carry', position, 'duration', registry)
@@ -0,0 +1,56 @@
+'''
+Possession chains of a match.
+
+Statsbomb numbers the possessions of a match and tags every event with its possession and the team in
+possession, and the events of one possession are contiguous. A PossessionIndex turns the possession
+column of an EventTable into row ranges once, so the chain of any event is found in O(1).
+'''
+import numpy as np
+
+from eventstore import MISSING
+
+
+class PossessionIndex:
+    '''
+    Row ranges of the possessions of an EventTable (a whole match or the events of one team).
+    '''
+
+    def __init__(self, table):
+        '''
+        :param table: EventTable with the possession and possession_team_id columns
+        '''
+        possession = table['possession']
+        n = len(possession)
+        self.starts = np.flatnonzero(np.r_[True, possession[1:] != possession[:-1]]) if n else np.zeros(0, int)
+        self.ends = np.r_[self.starts[1:], n].astype(int)
+        self.possession_team_id = table['possession_team_id']
+        self.run_of_row = np.repeat(np.arange(len(self.starts)), self.ends - self.starts)
+        self.missing = possession == MISSING
+        self.team_id = table['team_id']
+        self.located = table.located_mask()
+
+    def sequence(self, row):
+        '''
+        :param row: row of an event
+        :return: slice of the rows of the event's possession
+        '''
+        run = self.run_of_row[row]
+        return slice(self.starts[run], self.ends[run])
+
+    def build_up(self, row, lookback):
+        '''
+        :param row: row of a shot
+        :param lookback: rows looked back when the table has no possession data for the row
+        :return: located rows of the shot's possession from its start up to and including the shot, by the
+                 shooting team; only the shot if the possession was not the shooting team's
+        '''
+        if self.missing[row]:
+            # A plain slice, as the window has always been taken: a shot less than lookback rows from the
+            # start gets no build-up
+            rows = np.arange(len(self.missing))[row - lookback : row + 1]
+        elif self.possession_team_id[row] != self.team_id[row]:
+            rows = np.array([row])
+        else:
+            rows = np.arange(self.starts[self.run_of_row[row]], row + 1)
+            rows = rows[self.team_id[rows] == self.team_id[row]]
+        return rows[self.located[rows]]
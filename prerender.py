@@ -0,0 +1,139 @@
+'''
+Render every figure of every match view of a season ahead of time.
+
+For every match, three views are rendered:
+- plots: the tactic plots and formations of both teams;
+- matrix1 and matrix2: the position matrix of each team.
+Each view is written as the gzip-compressed JSON list of its figures to
+{out_dir}/{competition_id}/{season_id}/{match_id}/{view}.json.gz. Next to the views, manifest.json records
+the code, data and baselines versions the figures were built from, and the size and sha256 of every
+file. Matches run in parallel on a process pool and the manifest is written last, once every match is
+done.
+
+    python prerender.py [--competition 72 --season 107] [--workers 8] [--out-dir DIR] [match_id ...]
+
+With STATSBOMB_PREBUILT=1 the app serves these files and builds no figures itself (see dash_app).
+'''
+import argparse
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from plotly.io.json import to_json_plotly
+
+from competitions import registry
+from eventcache import write_atomic
+from figurecache import CODE_VERSION, data_version
+from figurepool import build_figures
+from views import matrix_builds, plot_builds
+
+PREBUILT_DIR = os.environ.get('STATSBOMB_PREBUILT_DIR',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prebuilt'))
+
+VIEWS = ['plots', 'matrix1', 'matrix2']
+
+
+def season_path(competition_id, season_id, out_dir=None):
+    return os.path.join(out_dir or PREBUILT_DIR, str(competition_id), str(season_id))
+
+
+def view_path(competition_id, season_id, match_id, view, out_dir=None):
+    return os.path.join(season_path(competition_id, season_id, out_dir), str(match_id), f'{view}.json.gz')
+
+
+def render_match(competition_id, season_id, match_id, out_dir=None):
+    '''
+    Runs in a worker process.
+    :return: manifest entry of the match: data version and size and sha256 of every view file
+    '''
+    season = registry.get(competition_id, season_id)
+    team1, team2 = season.teams(match_id)
+    builds = {'plots': plot_builds(season, match_id),
+              'matrix1': matrix_builds(season, match_id, team1),
+              'matrix2': matrix_builds(season, match_id, team2)}
+
+    files = {}
+    for view in VIEWS:
+        data = gzip.compress(to_json_plotly(build_figures(builds[view])).encode(), compresslevel=9)
+        write_atomic(view_path(competition_id, season_id, match_id, view, out_dir), data)
+        files[view] = {'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+    return {'data_sha256': data_version(match_id), 'teams': [team1, team2], 'files': files}
+
+
+def build(competition_id, season_id, match_ids, out_dir=None, workers=None):
+    '''
+    :param match_ids: matches to render
+    :param workers: size of the process pool, defaults to the number of CPUs
+    :return: the manifest
+    '''
+    n = len(match_ids)
+    # Spawned workers start from a clean interpreter instead of a fork of this one and its threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        entries = list(pool.map(render_match, [competition_id] * n, [season_id] * n, match_ids, [out_dir] * n))
+
+    manifest = {'code_version': CODE_VERSION,
+                'baselines_version': registry.get(competition_id, season_id).baselines.version(),
+                'created': time.time(),
+                'matches': {}}
+    # Matches rendered before by the same code from the same baselines stay in the manifest
+    previous = read_manifest(competition_id, season_id, out_dir)
+    if previous and all(previous[name] == manifest[name] for name in ('code_version', 'baselines_version')):
+        manifest['matches'].update(previous['matches'])
+    manifest['matches'].update({str(match_id): entry for match_id, entry in zip(match_ids, entries)})
+    write_atomic(os.path.join(season_path(competition_id, season_id, out_dir), 'manifest.json'),
+                 json.dumps(manifest, indent=1).encode())
+    return manifest
+
+
+def read_manifest(competition_id, season_id, out_dir=None):
+    '''
+    :return: the manifest of a season, None if the season has not been prerendered
+    '''
+    try:
+        with open(os.path.join(season_path(competition_id, season_id, out_dir), 'manifest.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load_view(competition_id, season_id, match_id, view, out_dir=None):
+    '''
+    :return: list of the figures of a prerendered view as plain dicts, None if it has not been rendered
+    '''
+    try:
+        with gzip.open(view_path(competition_id, season_id, match_id, view, out_dir), 'rb') as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render every figure of every match view ahead of time.')
+    parser.add_argument('match_ids', type=int, nargs='*', help='matches to render (default: all of the season)')
+    parser.add_argument('--competition', type=int, default=72)
+    parser.add_argument('--season', type=int, default=107)
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (default: CPU count)')
+    parser.add_argument('--out-dir', default=None, help=f'output directory (default: {PREBUILT_DIR})')
+    args = parser.parse_args(argv)
+
+    season = registry.get(args.competition, args.season)
+    if not season.catalog.ensure_loaded():
+        raise SystemExit(f'The match list of {args.competition}/{args.season} could not be loaded')
+    if not season.baselines.exists():
+        raise SystemExit(f'Build the baselines first: python build_baselines.py '
+                         f'--competition {args.competition} --season {args.season}')
+
+    started = time.time()
+    match_ids = args.match_ids or [match['match_id'] for match in season.matches]
+    manifest = build(args.competition, args.season, match_ids, args.out_dir, args.workers)
+    total = sum(f['bytes'] for entry in manifest['matches'].values() for f in entry['files'].values())
+    print(f'Rendered {len(match_ids)} matches in {time.time() - started:.1f}s, '
+          f'{len(manifest["matches"])} matches prebuilt ({total / 2**20:.1f} MB)')
+
+
+if __name__ == '__main__':
+    main()
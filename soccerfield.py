@@ -1,9 +1,42 @@
+import functools
+
 import pandas as pd
 import numpy as np
 import dash
 import plotly.graph_objects as go
 
+def _number(value):
+    return f'{round(float(value), 3):g}'
+
+def arc_path(x, y, radius, start, end):
+    '''
+    SVG path of a circular arc as two cubic Bezier curves, since Plotly shape paths have no arc command.
+    :param x, y: centre of the circle
+    :param radius:
+    :param start, end: angles in radians, the arc is drawn from start to end
+    :return: path of a go.layout.Shape of type 'path'
+    '''
+    def point(angle):
+        return np.array([x, y]) + radius * np.array([np.cos(angle), np.sin(angle)])
+
+    def tangent(angle):
+        return radius * np.array([-np.sin(angle), np.cos(angle)])
+
+    # Each half of angle a = (end - start) / 2 has its control points 4/3 tan(a/4) radii along the tangents
+    k = 4 / 3 * np.tan((end - start) / 8)
+    angles = np.linspace(start, end, 3)
+    path = 'M {},{}'.format(*map(_number, point(start)))
+    for a0, a1 in zip(angles[:-1], angles[1:]):
+        points = (point(a0) + k * tangent(a0), point(a1) - k * tangent(a1), point(a1))
+        path += ' C ' + ' '.join('{},{}'.format(*map(_number, p)) for p in points)
+    return path
+
+@functools.lru_cache(maxsize=None)
 def get_layout():
+    '''
+    :return: layout of the pitch as a plain dict, built once per process. Figures take its shapes over as
+             they are, without Plotly validation, so it is shared and must not be changed in place
+    '''
     
     field_shape = go.layout.Shape(
         type="rect",
@@ -53,27 +86,19 @@ def get_layout():
         fillcolor='rgba(0, 0, 0, 0)'
     )
     
-    center_left = (12, 40)
-    radius = 10
-    theta = np.linspace(np.arccos((18 - 12) / 10), -np.arccos((18 - 12) / 10), 100)
-    x_left = 12 + radius * np.cos(theta)
-    x_right = 120-x_left   
-    y = 40 + radius * np.sin(theta)
-    
+    # Penalty arcs: the circle of radius 10 around the penalty spot, outside the box
+    angle = np.arccos((18 - 12) / 10)
+
     arc_left = go.layout.Shape(
         type="path",
-        path=f"M {x_left[0]},{y[0]}"
-             + " L" + " L".join([f"{x_val},{y_val}" for x_val, y_val in zip(x_left, y)])
-             + f" L {x_left[-1]},{y[-1]}",
+        path=arc_path(12, 40, 10, angle, -angle),
         line=dict(color='darkgrey', width=0.5, dash='solid'),
         fillcolor='rgba(0, 0, 0, 0)'
     )
     
     arc_right = go.layout.Shape(
         type="path",
-        path=f"M {x_right[0]},{y[0]}"
-             + " L" + " L".join([f"{x_val},{y_val}" for x_val, y_val in zip(x_right, y)])
-             + f" L {x_right[-1]},{y[-1]}",
+        path=arc_path(108, 40, 10, np.pi - angle, np.pi + angle),
         line=dict(color='darkgrey', width=0.5, dash='solid'),
         fillcolor='rgba(0, 0, 0, 0)'
     )    
@@ -99,4 +124,6 @@ def get_layout():
         shapes = [field_shape, center_line, box_left, box_right, box_left_small, box_right_small,
                  center_circle, arc_left, arc_right, goal_left, goal_right]
     )
-    return layout
\ No newline at end of file
+    layout = layout.to_plotly_json()
+    layout['shapes'] = tuple(layout['shapes'])
+    return layout
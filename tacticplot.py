@@ -1,11 +1,10 @@
-import requests
+import numpy as np
 import plotly.graph_objects as go
 
 import soccerfield, soccerfield2
-
-def load_json(url):
-    response = requests.get(url)
-    return response.json()
+from eventstore import MISSING
+from eventtable import EventTable
+from possession import PossessionIndex
 
 # Generate position dictionary to plot formation. Refer to Statsbomb data specification.
 position_dict = {1:(10, 40),
@@ -25,341 +24,325 @@ passes = 'RGB(26,26,26)'
 
 def get_events(events):
     '''
-    :param events: json data which contains events related to a specified team in a specified match
+    :param events: json data which contains events related to a specified team in a specified match,
+                   or an EventTable of them
     :return: multiple tuples, each contains a json data for a certain action
     '''
-    
-    goal_events = [e for e in events if e['type']['id'] == 16 and 
-            e['shot']['outcome']['name'] == 'Goal' and e['period'] != 5]
-    no_goal_events = [e for e in events if e['type']['id'] == 16 and 
-            e['shot']['outcome']['name'] != 'Goal' and e['period'] != 5]
-
-    goal_seq = {}
-    for e in goal_events:        
-        before_goal_events = events[events.index(e)-5 : events.index(e)+1]
-        before_goal_events = [e for e in before_goal_events if 'location' in e]
-        goal_seq[e['index']] = before_goal_events
-        
-    no_goal_seq = {}
-    for e in no_goal_events:
-        before_no_goal_events = events[events.index(e)-4 : events.index(e)+1]
-        before_no_goal_events= [e for e in before_no_goal_events if 'location' in e]
-        no_goal_seq[e['index']] = before_no_goal_events    
-    
-    carry = [e for e in events if e['type']['id'] == 43 and e['duration'] > 3.5] 
-
-    defense = [e for e in events if e['type']['id'] == 9 or 
-                                    (e['type']['id'] == 4 and e['duel']['type']['id'] == 11 and e['duel']['outcome'] in [4, 15, 16, 17]) or
-                                    (e['type']['id'] == 10 and e['interception']['outcome']['id'] in [4, 15, 16, 17])]
-
-    defense_no = [e for e in events if (e['type']['id'] == 4 and e['duel']['type']['id'] == 11 and e['duel']['outcome'] not in [4, 15, 16, 17]) or
-                                       (e['type']['id'] == 4 and e['duel']['type']['id'] == 10) or
-                                       (e['type']['id'] == 10 and e['interception']['outcome']['id'] not in [4, 15, 16, 17])]
-
-    passes_l = [e for e in events if e['type']['id'] == 30 and e['pass']['length'] > 40 and 'outcome' not in e['pass']]
-
-    starting_XI = [e for e in events if e['type']['id'] == 35]
-    tactic_shift = [e for e in events if e['type']['id'] == 36]
-
-    return (goal_events, no_goal_events, goal_seq, no_goal_seq, carry, defense,
+    table = events if isinstance(events, EventTable) else EventTable.from_events(events)
+    return rows_to_events(table, *classify_rows(table))
+
+def classify_rows(table):
+    '''
+    The categories of get_events as row indices of an EventTable, computed with vectorized masks.
+    :param table: EventTable of a specified team in a specified match
+    :return: (list of row arrays for goals, no goals, carry, defense, defense no success, long passes,
+             starting XI and tactical shifts; dict of goal row to the located rows of its build-up;
+             same dict for no goal shots)
+    '''
+    type_id = table['type_id']
+    shot = (type_id == 16) & (table['period'] != 5)
+    goal_mask = shot & table.shot_outcome_mask('Goal')
+    no_goal_mask = shot & ~goal_mask
+    # Tackles are never a success: the original classification compared the duel outcome object, not its id
+    tackle = (type_id == 4) & (table['duel_type_id'] == 11)
+    interception_won = (type_id == 10) & np.isin(table['interception_outcome_id'], [4, 15, 16, 17])
+    masks = [goal_mask, no_goal_mask,
+             (type_id == 43) & (table['duration'] > 3.5),
+             (type_id == 9) | interception_won,
+             tackle | ((type_id == 4) & (table['duel_type_id'] == 10)) | ((type_id == 10) & ~interception_won),
+             (type_id == 30) & (table['pass_length'] > 40) & (table['pass_outcome_id'] == MISSING),
+             type_id == 35,
+             type_id == 36]
+
+    # Build-ups of the shots from the possession chains; without possession data, the last 5 events before
+    # a goal and 4 before another shot
+    possessions = PossessionIndex(table)
+
+    def windows(mask, lookback):
+        return {i: possessions.build_up(i, lookback) for i in np.flatnonzero(mask).tolist()}
+
+    return [np.flatnonzero(mask) for mask in masks], windows(goal_mask, 5), windows(no_goal_mask, 4)
+
+def rows_to_events(table, rows, goal_windows, no_goal_windows):
+    '''
+    :param table: EventTable the rows index into
+    :param rows, goal_windows, no_goal_windows: as returned by classify_rows
+    :return: same tuples as get_events, building each needed event dict once
+    '''
+    needed = [np.asarray(r, dtype=np.int64) for r in rows]
+    needed += [np.asarray(w, dtype=np.int64) for w in list(goal_windows.values()) + list(no_goal_windows.values())]
+    needed = np.unique(np.concatenate(needed)) if needed else np.zeros(0, dtype=np.int64)
+    events = dict(zip(needed.tolist(), table.to_events(needed)))
+
+    def sequences(windows):
+        return {events[i]['index']: [events[j] for j in np.asarray(w).tolist()] for i, w in windows.items()}
+
+    goal_events, no_goal_events, carry, defense, defense_no, passes_l, starting_XI, tactic_shift = \
+        [[events[i] for i in np.asarray(r).tolist()] for r in rows]
+    return (goal_events, no_goal_events, sequences(goal_windows), sequences(no_goal_windows), carry, defense,
             defense_no, passes_l, starting_XI, tactic_shift)
 
-def plot(team1_name, team1_tuples, team2_tuples):
+def formation_changes(team_tuples):
     '''
-    :param team1_name:
-    :param team1_tuples: a tuple generated by function get_events(event) for team 1
-    :param team2_tuples: a tuple generated by function get_events(event) for team 2
-    :return: plot figure
+    :param team_tuples: a tuple generated by function get_events(event)
+    :return: (starting XI position ids, list of (minute, second, position ids) of the tactical shifts
+             that changed the formation)
+    '''
+    start_ids = [player['position']['id'] for player in team_tuples[8][0]['tactics']['lineup']]
+    changes = []
+    tac_temp = start_ids
+    for tac in team_tuples[9]:
+        position_ids = [player['position']['id'] for player in tac['tactics']['lineup']]
+        if position_ids != tac_temp:
+            changes.append((tac['minute'], tac['second'], position_ids))
+            tac_temp = position_ids
+    return start_ids, changes
+
+# Pitch size; a mirrored point (x, y) is drawn at (120-x, 80-y)
+PITCH = np.array([120., 80.])
+
+# position_dict as an array indexed by position id, NaN for ids without a position
+position_xy = np.full((max(position_dict) + 1, 2), np.nan)
+for position_id, xy in position_dict.items():
+    position_xy[position_id] = xy
+
+def orient(xy, mirrored):
+    '''
+    :param xy: (n, 2) array of points, NaN rows separate lines
+    :param mirrored: rotate the points by 180 degrees around the centre of the pitch
+    :return: points as drawn
+    '''
+    return PITCH - xy if mirrored else xy
+
+def _on_pitch(fig, pitch):
+    '''
+    :param fig: go.Figure with the traces and the layout of a plot, without the pitch
+    :param pitch: plain dict pitch layout, see soccerfield.get_layout
+    :return: figure dict of fig over the pitch; the shared pitch shapes are not validated or copied
+    '''
+    figure = fig.to_plotly_json()
+    layout = figure['layout']
+    figure['layout'] = dict(pitch, **layout)
+    for axis in ('xaxis', 'yaxis'):
+        figure['layout'][axis] = dict(pitch[axis], **layout.get(axis, {}))
+    return figure
+
+def _segments(starts, ends):
+    '''
+    :param starts, ends: (n, 2) arrays of the start and end points of n segments
+    :return: points of the segments separated by NaN rows, so one line trace draws them as separate lines
+    '''
+    xy = np.full((len(starts), 3, 2), np.nan)
+    xy[:, 0], xy[:, 1] = starts, ends
+    return xy.reshape(-1, 2)[:-1]
+
+def _paths(paths):
+    '''
+    :param paths: list of (k, 2) arrays
+    :return: points of the non-empty paths separated by NaN rows
+    '''
+    separator = np.full((1, 2), np.nan)
+    parts = [part for path in paths if len(path) for part in (separator, path)]
+    return np.concatenate(parts[1:]) if parts else np.zeros((0, 2))
+
+def _layers(goal, no_goal, goal_paths, no_goal_paths, carry_start, carry_end, pass_start, pass_end,
+            defense_xy, defense_no_xy):
+    '''
+    :return: dict of layer name to (n, 2) array of points, see tactic_layers
+    '''
+    def build_up(paths):
+        return np.concatenate([path[:-1] for path in paths]) if paths else np.zeros((0, 2))
+
+    return {'goal': goal, 'no_goal': no_goal,
+            'goal_build_up': build_up(goal_paths), 'goal_paths': _paths(goal_paths),
+            'no_goal_build_up': build_up(no_goal_paths), 'no_goal_paths': _paths(no_goal_paths),
+            'carry': _segments(carry_start, carry_end),
+            'pass_start': pass_start, 'pass_end': pass_end, 'pass': _segments(pass_start, pass_end),
+            'defense': defense_xy, 'defense_no': defense_no_xy}
+
+def tactic_layers(team_tuples):
+    '''
+    Points of everything a tactic plot draws of a team, in the team's own orientation. They are computed
+    once and drawn either way up by tactic_plot.
+    :param team_tuples: a tuple generated by function get_events(event)
+    :return: dict of layer name to (n, 2) array: shots ('goal', 'no_goal'), their build-up markers
+             ('goal_build_up', 'no_goal_build_up') and lines ('goal_paths', 'no_goal_paths'), carry lines
+             ('carry'), long pass markers and lines ('pass_start', 'pass_end', 'pass') and defense actions
+             ('defense', 'defense_no')
+    '''
+    def xy(events, end=None):
+        points = [(e[end]['end_location'] if end else e['location'])[:2] for e in events]
+        return np.array(points, dtype=float).reshape(-1, 2)
+
+    return _layers(xy(team_tuples[0]), xy(team_tuples[1]),
+                   [xy(seq) for seq in team_tuples[2].values()], [xy(seq) for seq in team_tuples[3].values()],
+                   xy(team_tuples[4]), xy(team_tuples[4], 'carry'), xy(team_tuples[7]), xy(team_tuples[7], 'pass'),
+                   xy(team_tuples[5]), xy(team_tuples[6]))
+
+def table_layers(table, rows, goal_windows, no_goal_windows):
+    '''
+    tactic_layers read straight from the columns of an EventTable, without building event dicts.
+    :param table: EventTable the rows index into
+    :param rows, goal_windows, no_goal_windows: as returned by classify_rows
+    '''
+    location = np.column_stack([table['x'], table['y']])
+    end = np.column_stack([table['end_x'], table['end_y']])
+    return _layers(location[rows[0]], location[rows[1]],
+                   [location[w] for w in goal_windows.values()], [location[w] for w in no_goal_windows.values()],
+                   location[rows[2]], end[rows[2]], location[rows[5]], end[rows[5]],
+                   location[rows[3]], location[rows[4]])
+
+def tactic_plot(team_name, team_layers, opponent_layers, mirrored=False):
+    '''
+    :param team_name:
+    :param team_layers: tactic_layers of the team
+    :param opponent_layers: tactic_layers of its opponent, drawn the other way up
+    :param mirrored: rotate the team by 180 degrees, as in the lower plot
+    :return: plot figure dict
     '''
+    def team(layer):
+        return orient(team_layers[layer], mirrored)
+
+    def opponent(layer):
+        return orient(opponent_layers[layer], not mirrored)
+
     # Import soccer field layout and set up plot layout
     field_layout = soccerfield.get_layout()
 
-    fig = go.Figure(layout=field_layout)
-    fig.update_layout(title=dict(text=f'{team1_name} Tactic Plot',
+    # The lower plot leaves its legend to the automatic anchor
+    legend = dict(x=1, y=0.85, font = dict(family = "Roboto, sans-serif", size = 14))
+    if not mirrored:
+        legend['xanchor'] = "left"
+
+    fig = go.Figure()
+    fig.update_layout(title=dict(text=f'{team_name} Tactic Plot',
                                  xanchor="left", x=0.8, y=0.89),
                       title_font=dict(family = "Roboto, sans-serif", size=18, color='forestgreen'),
                       width=1120, height=680, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor='rgba(0,0,0,0)',
                       margin=dict(l=0, r=100, t=0, b=0),
                       xaxis=dict(showgrid=False, zeroline=False), yaxis=dict(showgrid=False, zeroline=False),
-                      legend=dict(xanchor="left", x=1, y=0.85,
-                                  font = dict(family = "Roboto, sans-serif", size = 14))
+                      legend=legend
                       )
 
     fig.update_layout(dragmode= False)
 
-    # Plot opponent carry events
+    # Plot opponent carry events, all carries as one line trace
     fig.add_trace(go.Scatter(x = [None], y = [None], legendgroup = 'carry', name = 'opponent carry (>3.5s)',
                             mode='lines', line=dict(color=carry, width = 1.8, dash = 'dashdot')))
-    for e in team2_tuples[4]:
-        fig.add_trace(go.Scatter(
-            x = [120-e['location'][0], 120-e['carry']['end_location'][0]],
-            y = [80-e['location'][1], 80-e['carry']['end_location'][1]],
-            legendgroup = 'carry',
-            showlegend = False,
-            mode='lines',
-            line=dict(color=carry, width = 1.6, dash = 'dashdot')
-        ))
+    xy = opponent('carry')
+    fig.add_trace(go.Scatter(
+        x = xy[:, 0],
+        y = xy[:, 1],
+        legendgroup = 'carry',
+        showlegend = False,
+        mode='lines',
+        line=dict(color=carry, width = 1.6, dash = 'dashdot')
+    ))
 
-    # Plot opponent pass events
+    # Plot opponent pass events: end and start markers in one trace with per-point size and opacity,
+    # then all pass lines in one trace
     fig.add_trace(go.Scatter(x = [None], y = [None], legendgroup = 'passes', name = 'opponent long pass (>40 yards)',
                         mode='lines+markers',
                         marker = dict(symbol = 'circle-open', color = passes, size = 8),
                         line=dict(color=passes, width = 0.8, dash = 'dot')))
-    for e in team2_tuples[7]:
-        fig.add_trace(go.Scatter(
-            x = [120-e['pass']['end_location'][0]],
-            y = [80-e['pass']['end_location'][1]],
-            legendgroup = 'passes',
-            showlegend=False,
-            mode='markers', marker=dict(size=6, symbol = 'circle-open', color= passes, opacity=0.9)))
-        fig.add_trace(go.Scatter(
-            x = [120-e['location'][0]],
-            y = [80-e['location'][1]],
-            legendgroup = 'passes',
-            showlegend = False,
-            mode='markers', marker=dict(size=3, symbol = 'circle-open', color= passes, opacity=0.6)))
-        fig.add_trace(go.Scatter(
-            x = [120-e['location'][0], 120-e['pass']['end_location'][0]],
-            y = [80-e['location'][1], 80-e['pass']['end_location'][1]],
-            legendgroup = 'passes',
-            showlegend = False,
-            mode='lines',
-            line=dict(color=passes, width = 0.3, dash = 'dot')
-        ))
-
-    # Plot no goal events
+    xy = np.concatenate([opponent('pass_end'), opponent('pass_start')])
+    n = len(opponent_layers['pass_end'])
     fig.add_trace(go.Scatter(
-        x = [e['location'][0] for e in team1_tuples[1]],
-        y = [e['location'][1] for e in team1_tuples[1]],
-        legendgroup = 'no goal shots',
-        name = 'shots w/ no goal',
+        x = xy[:, 0],
+        y = xy[:, 1],
+        legendgroup = 'passes',
+        showlegend = False,
         mode='markers',
-        marker=dict(size=7 , symbol = 'circle', color=no_goal)))
-
-    # Plot goal events
+        marker=dict(size=[6]*n + [3]*n, symbol = 'circle-open', color= passes, opacity=[0.9]*n + [0.6]*n)))
+    xy = opponent('pass')
     fig.add_trace(go.Scatter(
-        x = [e['location'][0] for e in team1_tuples[0]],
-        y = [e['location'][1] for e in team1_tuples[0]],
-        legendgroup = 'goal shots',
-        name = 'shots w/ goal',
-        mode='markers',
-        marker=dict(size=9, symbol = 'circle', color=goal)
+        x = xy[:, 0],
+        y = xy[:, 1],
+        legendgroup = 'passes',
+        showlegend = False,
+        mode='lines',
+        line=dict(color=passes, width = 0.3, dash = 'dot')
     ))
 
-    # Plot no goal recent trajectory events
-    for key, seq in team1_tuples[3].items():
+    # Plot no goal and goal events
+    for layer, group, name, size, color in (('no_goal', 'no goal shots', 'shots w/ no goal', 7, no_goal),
+                                            ('goal', 'goal shots', 'shots w/ goal', 9, goal)):
+        xy = team(layer)
         fig.add_trace(go.Scatter(
-            x = [e['location'][0] for e in seq[:-1]],
-            y = [e['location'][1] for e in seq[:-1]],
-            legendgroup = 'no goal shots',
+            x = xy[:, 0],
+            y = xy[:, 1],
+            legendgroup = group,
+            name = name,
+            mode='markers',
+            marker=dict(size=size, symbol = 'circle', color=color)))
+
+    # Plot build-ups of the shots, one marker trace and one line trace per outcome
+    for layer, group, color, width in (('no_goal', 'no goal shots', no_goal, 0.7),
+                                       ('goal', 'goal shots', goal, 1.2)):
+        xy = team(layer + '_build_up')
+        fig.add_trace(go.Scatter(
+            x = xy[:, 0],
+            y = xy[:, 1],
+            legendgroup = group,
             showlegend = False,
             mode='markers',
-            marker=dict( size=6, symbol = 'circle', color=no_goal, opacity=0.3)
-        ))        
-    for key, seq in team1_tuples[3].items():
+            marker=dict(size=6, symbol = 'circle', color=color, opacity=0.3)
+        ))
+        xy = team(layer + '_paths')
         fig.add_trace(go.Scatter(
-            x=[event['location'][0] for event in seq],  
-            y=[event['location'][1] for event in seq], 
-            legendgroup = 'no goal shots',
+            x = xy[:, 0],
+            y = xy[:, 1],
+            legendgroup = group,
             showlegend = False,
             mode='lines',
-            line=dict(color=no_goal, width = 0.7)
+            line=dict(color=color, width = width)
         ))
 
-    # Plot goal recent trajectory events
-    for key, seq in team1_tuples[2].items():
+    # Plot defense success and no success events
+    for layer, name, color in (('defense', 'defense-success', defense),
+                               ('defense_no', 'defense-no success', defense_no)):
+        xy = team(layer)
         fig.add_trace(go.Scatter(
-            x = [e['location'][0] for e in seq[:-1]],
-            y = [e['location'][1] for e in seq[:-1]],
-            legendgroup = 'goal shots',
-            showlegend = False,
+            x = xy[:, 0],
+            y = xy[:, 1],
+            name = name,
             mode='markers',
-            marker=dict(size=6, symbol = 'circle', color=goal, opacity=0.3)
-        ))        
-    for key, seq in team1_tuples[2].items():
-        fig.add_trace(go.Scatter(
-            x=[event['location'][0] for event in seq],  
-            y=[event['location'][1] for event in seq], 
-            legendgroup = 'goal shots',
-            showlegend = False,
-            mode='lines',
-            line=dict(color=goal, width = 1.2)
+            marker=dict(size=6, symbol = 'diamond', color=color, opacity=0.8)
         ))
 
-    # Plot defense success events
-    fig.add_trace(go.Scatter(
-        x = [e['location'][0] for e in team1_tuples[5]],
-        y = [e['location'][1] for e in team1_tuples[5]],
-        name = 'defense-success',
-        mode='markers',
-        marker=dict(size=6, symbol = 'diamond', color=defense, opacity=0.8)
-    ))
+    return _on_pitch(fig, field_layout)
 
-    # Plot defense no success events
-    fig.add_trace(go.Scatter(
-        x = [e['location'][0] for e in team1_tuples[6]],
-        y = [e['location'][1] for e in team1_tuples[6]],
-        name = 'defense-no success',
-        mode='markers',
-        marker=dict(size=6, symbol = 'diamond', color=defense_no, opacity=0.8)
-    ))
-    
-    return fig
+def plot(team1_name, team1_tuples, team2_tuples):
+    '''
+    :param team1_name:
+    :param team1_tuples: a tuple generated by function get_events(event) for team 1
+    :param team2_tuples: a tuple generated by function get_events(event) for team 2
+    :return: plot figure dict
+    '''
+    return tactic_plot(team1_name, tactic_layers(team1_tuples), tactic_layers(team2_tuples))
 
 def plot2(team2_name, team2_tuples, team1_tuples):
-    # Made a plot2 function because I want the lower plot to rotate for 180 degree. Didn't figure out a better way to do this.
     '''
+    Tactic plot of team 2, rotated by 180 degrees for the lower plot.
     :param team2_name:
     :param team2_tuples: a tuple generated by function get_events(event) for team 2
     :param team1_tuples: a tuple generated by function get_events(event) for team 1
-    :return: plot figure
+    :return: plot figure dict
     '''
-    # Import soccer field layout and set up plot layout
-    field_layout = soccerfield.get_layout()
+    return tactic_plot(team2_name, tactic_layers(team2_tuples), tactic_layers(team1_tuples), mirrored=True)
 
-    fig = go.Figure(layout=field_layout)
-    fig.update_layout(title=dict(text=f'{team2_name} Tactic Plot',
-                                 xanchor="left", x=0.80, y=0.89),
-                      title_font=dict(family = "Roboto, sans-serif", size=18, color='forestgreen'),
-                      width=1120, height=680, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor='rgba(0,0,0,0)',
-                      margin=dict(l=0, r=100, t=0, b=0),
-                      xaxis=dict(showgrid=False, zeroline=False), yaxis=dict(showgrid=False, zeroline=False),
-                      legend=dict(x=1, y=0.85,
-                                  font = dict(family = "Roboto, sans-serif", size = 14))
-                      )
-
-    fig.update_layout(dragmode=False)
-
-    # Plot opponent carry events
-    fig.add_trace(go.Scatter(x=[None], y=[None], legendgroup='carry', name='opponent carry (>3.5s)',
-                             mode='lines', line=dict(color=carry, width=1.8, dash='dashdot')))
-    for e in team1_tuples[4]:
-        fig.add_trace(go.Scatter(
-            x=[e['location'][0], e['carry']['end_location'][0]],
-            y=[e['location'][1], e['carry']['end_location'][1]],
-            legendgroup='carry',
-            showlegend=False,
-            mode='lines',
-            line=dict(color=carry, width=1.6, dash='dashdot')
-        ))
-
-    # Plot opponent pass events
-    fig.add_trace(go.Scatter(x=[None], y=[None], legendgroup='passes', name='opponent long pass (>40 yards)',
-                             mode='lines+markers',
-                             marker=dict(symbol='circle-open', color=passes, size=8),
-                             line=dict(color=passes, width=0.8, dash='dot')))
-    for e in team1_tuples[7]:
-        fig.add_trace(go.Scatter(
-            x=[e['pass']['end_location'][0]],
-            y=[e['pass']['end_location'][1]],
-            legendgroup='passes',
-            showlegend=False,
-            mode='markers', marker=dict(size=6, symbol='circle-open', color=passes, opacity=0.9)))
-        fig.add_trace(go.Scatter(
-            x=[e['location'][0]],
-            y=[e['location'][1]],
-            legendgroup='passes',
-            showlegend=False,
-            mode='markers', marker=dict(size=3, symbol='circle-open', color=passes, opacity=0.6)))
-        fig.add_trace(go.Scatter(
-            x=[e['location'][0], e['pass']['end_location'][0]],
-            y=[e['location'][1], e['pass']['end_location'][1]],
-            legendgroup='passes',
-            showlegend=False,
-            mode='lines',
-            line=dict(color=passes, width=0.3, dash='dot')
-        ))
-
-    # Plot no goal events
-    fig.add_trace(go.Scatter(
-        x=[120-e['location'][0] for e in team2_tuples[1]],
-        y=[80-e['location'][1] for e in team2_tuples[1]],
-        legendgroup='no goal shots',
-        name='shots w/ no goal',
-        mode='markers',
-        marker=dict(size=7, symbol='circle', color=no_goal)))
-
-    # Plot goal events
-    fig.add_trace(go.Scatter(
-        x=[120-e['location'][0] for e in team2_tuples[0]],
-        y=[80-e['location'][1] for e in team2_tuples[0]],
-        legendgroup='goal shots',
-        name='shots w/ goal',
-        mode='markers',
-        marker=dict(size=9, symbol='circle', color=goal)
-    ))
-
-    # Plot no goal recent trajectory events
-    for key, seq in team2_tuples[3].items():
-        fig.add_trace(go.Scatter(
-            x=[120-e['location'][0] for e in seq[:-1]],
-            y=[80-e['location'][1] for e in seq[:-1]],
-            legendgroup='no goal shots',
-            showlegend=False,
-            mode='markers',
-            marker=dict(size=6, symbol='circle', color=no_goal, opacity=0.3)
-        ))
-    for key, seq in team2_tuples[3].items():
-        fig.add_trace(go.Scatter(
-            x=[120-event['location'][0] for event in seq],
-            y=[80-event['location'][1] for event in seq],
-            legendgroup='no goal shots',
-            showlegend=False,
-            mode='lines',
-            line=dict(color=no_goal, width=0.7)
-        ))
-
-    # Plot goal recent trajectory events
-    for key, seq in team2_tuples[2].items():
-        fig.add_trace(go.Scatter(
-            x=[120-e['location'][0] for e in seq[:-1]],
-            y=[80-e['location'][1] for e in seq[:-1]],
-            legendgroup='goal shots',
-            showlegend=False,
-            mode='markers',
-            marker=dict(size=6, symbol='circle', color=goal, opacity=0.3)
-        ))
-    for key, seq in team2_tuples[2].items():
-        fig.add_trace(go.Scatter(
-            x=[120-event['location'][0] for event in seq],
-            y=[80-event['location'][1] for event in seq],
-            legendgroup='goal shots',
-            showlegend=False,
-            mode='lines',
-            line=dict(color=goal, width=1.2)
-        ))
-
-    # Plot defense success events
-    fig.add_trace(go.Scatter(
-        x=[120-e['location'][0] for e in team2_tuples[5]],
-        y=[80-e['location'][1] for e in team2_tuples[5]],
-        name='defense-success',
-        mode='markers',
-        marker=dict(size=6, symbol='diamond', color=defense, opacity=0.8)
-    ))
-
-    # Plot defense no success events
-    fig.add_trace(go.Scatter(
-        x=[120-e['location'][0] for e in team2_tuples[6]],
-        y=[80-e['location'][1] for e in team2_tuples[6]],
-        name='defense-no success',
-        mode='markers',
-        marker=dict(size=6, symbol='diamond', color=defense_no, opacity=0.8)
-    ))
-
-    return fig
-
-def formation(team1_name, team1_tuples):
+def formation_plot(team_name, changes, mirrored=False):
     '''
-    :param team1_name:
-    :param team1_tuples: a tuple generated by function get_events(event) for team 1
-    :return: plot figure
+    :param team_name:
+    :param changes: formation_changes of the team
+    :param mirrored: rotate the formation by 180 degrees, as in the lower plot
+    :return: plot figure dict
     '''
     # Import soccer field layout and set up plot layout
     field_layout = soccerfield2.get_layout()
 
-    fig = go.Figure(layout=field_layout)
-    fig.update_layout(title=dict(text=f'{team1_name} Formation',
+    fig = go.Figure()
+    fig.update_layout(title=dict(text=f'{team_name} Formation',
                                  yanchor="bottom", x=0.5, y=0.96),
                       title_font=dict(family="Roboto, sans-serif", size=14),
                       margin=dict(l=0, r=0, t=20, b=140),
@@ -370,78 +353,45 @@ def formation(team1_name, team1_tuples):
                       )
     fig.update_layout(dragmode=False)
 
-    # Get starting XI position id from event tuple
-    start_ids = [player['position']['id'] for player in team1_tuples[8][0]['tactics']['lineup']]
+    # Plot starting XI
+    start_ids, changes = changes
+    xy = orient(position_xy[start_ids], mirrored)
     fig.add_trace(go.Scatter(
-        x = [position_dict[i][0] for i in start_ids],
-        y = [position_dict[i][1] for i in start_ids],
+        x = xy[:, 0],
+        y = xy[:, 1],
         mode='markers',
         name = 'starting XI',
         marker=dict(size=8, symbol = 'circle', color='grey'),
     ))
 
-    # Get tactical shift position id from event tuple
-    tac_temp = start_ids
-    for tac in team1_tuples[9]:
-        m = tac['minute']
-        s =tac['second']
-        position_ids = [player['position']['id'] for player in tac['tactics']['lineup']]
-        if position_ids != tac_temp :
-            fig.add_trace(go.Scatter(
-                x=[position_dict[i][0] for i in position_ids],
-                y=[position_dict[i][1] for i in position_ids],
-                mode='markers',
-                name=f'tactical shift {m}:{s}',
-                marker=dict(size=8, symbol='circle', color='tan'),
-                visible='legendonly'
-            ))
-            tac_temp = position_ids
-    return fig
+    # Plot tactical shifts which changed the formation
+    for m, s, position_ids in changes:
+        xy = orient(position_xy[position_ids], mirrored)
+        fig.add_trace(go.Scatter(
+            x=xy[:, 0],
+            y=xy[:, 1],
+            mode='markers',
+            name=f'tactical shift {m}:{s}',
+            marker=dict(size=8, symbol='circle', color='tan'),
+            visible='legendonly'
+        ))
+    return _on_pitch(fig, field_layout)
+
+def formation(team1_name, team1_tuples, changes=None):
+    '''
+    :param team1_name:
+    :param team1_tuples: a tuple generated by function get_events(event) for team 1
+    :param changes: formation_changes(team1_tuples), computed if not given
+    :return: plot figure dict
+    '''
+    return formation_plot(team1_name, changes or formation_changes(team1_tuples))
 
-def formation2(team2_name, team2_tuples):
-    # Made a formation2 function because I want the lower plot to rotate for 180 degree. Didn't figure out a better way to do this.
+def formation2(team2_name, team2_tuples, changes=None):
     '''
+    Formation of team 2, rotated by 180 degrees for the lower plot.
     :param team2_name:
     :param team2_tuples: a tuple generated by function get_events(event) for team 2
-    :return: plot figure
+    :param changes: formation_changes(team2_tuples), computed if not given
+    :return: plot figure dict
     '''
-    # Import soccer field layout and set up plot layout
-    field_layout = soccerfield2.get_layout()
-
-    fig = go.Figure(layout=field_layout)
-    fig.update_layout(title=dict(text=f'{team2_name} Formation',
-                                 yanchor="bottom", x=0.5, y=0.96),
-                      title_font=dict(family="Roboto, sans-serif", size=14),
-                      margin=dict(l=0, r=0, t=20, b=140),
-                      xaxis=dict(showgrid=False, zeroline=False), yaxis=dict(showgrid=False, zeroline=False),
-                      legend=dict(xanchor="left", yanchor="top",
-                                  x=0, y=0, font=dict(family="Roboto, sans-serif", size=14)),
-                      paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor='rgba(0,0,0,0)',
-                      )
-    fig.update_layout(dragmode=False)
-
-    start_ids = [player['position']['id'] for player in team2_tuples[8][0]['tactics']['lineup']]
-    fig.add_trace(go.Scatter(
-        x=[120-position_dict[i][0] for i in start_ids],
-        y=[80-position_dict[i][1] for i in start_ids],
-        mode='markers',
-        name='starting XI',
-        marker=dict(size=8, symbol='circle', color='grey'),
-    ))
-
-    tac_temp = start_ids
-    for tac in team2_tuples[9]:
-        m = tac['minute']
-        s = tac['second']
-        position_ids = [player['position']['id'] for player in tac['tactics']['lineup']]
-        if position_ids != tac_temp:
-            fig.add_trace(go.Scatter(
-                x=[120-position_dict[i][0] for i in position_ids],
-                y=[80-position_dict[i][1] for i in position_ids],
-                mode='markers',
-                name=f'tactical shift {m}:{s}',
-                marker=dict(size=8, symbol='circle', color='tan'),
-                visible='legendonly'
-            ))
-            tac_temp = position_ids
-    return fig
+    return formation_plot(team2_name, changes or formation_changes(team2_tuples), mirrored=True)
@@ -0,0 +1,81 @@
+'''
+Figures of the match views: the tactic plots and formations of both teams, and the position matrix of
+each team.
+
+The app serves them through the figure cache (see figurecache); prerender.py builds all of them ahead of
+time. Both go through the builds defined here, so prebuilt and live figures are the same.
+'''
+from bundle import get_match_bundle
+from competitions import team_name
+from figurecache import data_version, figure_cache
+from positionplot import (plot_contour, plot_ballreceipt, plot_defence,
+                          plot_passlength, plot_passangle, plot_shot, plot_carry)
+from tacticplot import formation_plot, tactic_plot
+
+# Figures of the position matrix, one row per position group: plot function and its arguments after the
+# events and the position group
+MATRIX = [
+    ('centerback', [(plot_contour,), (plot_defence, 0), (plot_defence, 1), (plot_ballreceipt, 0),
+                    (plot_ballreceipt, 1), (plot_passlength,)]),
+    ('fullback', [(plot_contour,), (plot_defence, 0), (plot_defence, 1), (plot_ballreceipt, 0),
+                  (plot_ballreceipt, 1), (plot_passangle,)]),
+    ('midfielder', [(plot_contour,), (plot_defence, 0), (plot_defence, 1), (plot_ballreceipt, 0),
+                    (plot_carry,), (plot_shot, 0)]),
+    ('winger', [(plot_contour,), (plot_defence, 0), (plot_ballreceipt, 0), (plot_passangle,),
+                (plot_carry,), (plot_shot, 0)]),
+    ('striker', [(plot_contour,), (plot_ballreceipt, 0), (plot_ballreceipt, 1), (plot_carry,),
+                 (plot_shot, 1), (plot_shot, 0)]),
+]
+
+
+def plot_builds(season, match_id):
+    '''
+    :param season: competitions.Season of the match
+    :return: figurepool builds of the tactic plots of team 1 and team 2, then their formations
+    '''
+    team1, team2 = season.teams(match_id)
+    team1_name = team_name(team1)
+    team2_name = team_name(team2)
+
+    # Load the derived match data, built once per event file from Statsbomb
+    bundle = get_match_bundle(match_id)
+
+    # Get the points of team actions, each drawn the right way up in one plot and rotated in the other
+    team1_layers = bundle.layers(team1)
+    team2_layers = bundle.layers(team2)
+    return [(tactic_plot, (team1_name, team1_layers, team2_layers), {}),
+            (tactic_plot, (team2_name, team2_layers, team1_layers), {'mirrored': True}),
+            (formation_plot, (team1_name, bundle.formation(team1)), {}),
+            (formation_plot, (team2_name, bundle.formation(team2)), {'mirrored': True})]
+
+
+def matrix_builds(season, match_id, team):
+    '''
+    :param team: Statsbomb name of the team
+    :return: figurepool builds of the position matrix figures of the team, in layout order
+    '''
+    events = get_match_bundle(match_id).selection(team)
+    return [(function, (events, position, *args),
+             {} if function is plot_contour else {'registry': season.baselines})
+            for position, cells in MATRIX for function, *args in cells]
+
+
+def plot_figures(season, match_id):
+    '''
+    :return: the figures of plot_builds, from the figure cache or built on the figure pool
+    '''
+    team1, team2 = season.teams(match_id)
+    version = data_version(match_id)
+    keys = [figure_cache.key(figure, match_id, team, team_name(team), version)
+            for figure in ('tactic_plot', 'formation_plot') for team in (team1, team2)]
+    return figure_cache.figures(keys, lambda: plot_builds(season, match_id), processes=True)
+
+
+def matrix_figures(season, match_id, team):
+    '''
+    :return: the figures of matrix_builds, from the figure cache or built on the figure pool
+    '''
+    version = data_version(match_id), season.baselines.version()
+    keys = [figure_cache.key(function.__name__, position, *args, match_id, team, *version)
+            for position, cells in MATRIX for function, *args in cells]
+    return figure_cache.figures(keys, lambda: matrix_builds(season, match_id, team))
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bundle import get_match_bundle
+from eventcache import DECODED_FACTOR, ensure_cached, event_url, match_events_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MATCH = 3906390
+
+
+def priority_order(matches, default_match=DEFAULT_MATCH):
+    '''
+    :param matches: match list of a season as published by Statsbomb
+    :param default_match: match shown when the app opens, warmed first
+    :return: match ids, default match first, then knockout matches latest first, then group stage
+    '''
+    latest_first = sorted(matches, key=lambda m: (m['match_date'], m.get('kick_off') or ''), reverse=True)
+    ordered = sorted(latest_first, key=lambda m: (m['match_id'] != default_match,
+                                                  m['competition_stage']['name'] == 'Group Stage'))
+    return [match['match_id'] for match in ordered]
+
+
+class Warmup:
+    '''
+    Fetches every match of a season into the disk cache on a bounded thread pool, loading matches and
+    their bundles into the shared event cache for as long as they fit without evicting anything.
+    '''
+
+    def __init__(self, season, workers=4):
+        '''
+        :param season: competitions.Season to warm, its match list is read when the warm-up starts
+        '''
+        self.season = season
+        self.match_ids = []
+        self.workers = workers
+        self.done = 0
+        self.failed = []
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _warm(self, match_id):
+        try:
+            meta = ensure_cached(f'events/{match_id}', event_url(match_id))
+            # Leave room for the matches other workers may be decoding at the same time
+            if match_events_cache.has_room(meta['size'] * DECODED_FACTOR * self.workers):
+                get_match_bundle(match_id)
+        except Exception:
+            logger.exception('Warm-up of match %s failed', match_id)
+            with self._lock:
+                self.failed.append(match_id)
+        finally:
+            with self._lock:
+                self.done += 1
+
+    def _run(self):
+        self.started = time.time()
+        # A season without a snapshot or cached match list boots empty: load the list first
+        self.season.catalog.ensure_loaded()
+        match_ids = priority_order(self.season.matches, self.season.default_match())
+        with self._lock:
+            self.match_ids = match_ids
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='warmup') as pool:
+            list(pool.map(self._warm, self.match_ids))
+        self.finished = time.time()
+        logger.info('Warm-up of %d matches finished in %.1fs', len(self.match_ids),
+                    self.finished - self.started)
+
+    def start(self):
+        '''
+        Start warming in a daemon thread and return immediately.
+        '''
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def progress(self):
+        '''
+        :return: dict describing how far the warm-up got
+        '''
+        with self._lock:
+            return {'total': len(self.match_ids), 'done': self.done, 'failed': list(self.failed),
+                    'running': self.started is not None and self.finished is None,
+                    'seconds': round((self.finished or time.time()) - self.started, 1) if self.started else 0}